@@ -1,15 +1,60 @@
 # working
-from fastapi import FastAPI
+import time
+
+_import_started = time.perf_counter()
+
+import asyncio
+import threading
+from contextlib import asynccontextmanager, suppress
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from api.routes import (
     transactionrouter,
     loanrouter,
+    metricsrouter,
     analyticsrouter,
     userrouter,
 )
+from api.config import logger, settings
+from api.database import new_purchase_listeners, transaction_sync_loop
+from api.http_client import close_http_client
+from api.request_context import request_scope
+from api.routes.analytics import plan_cache, summary_refresher
+from api.routes.loan import loan_model_registry
+from api.startup import record, startup_timings, timed, warm_imports
+from api.transaction_store import close_transaction_store
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    with timed("lifespan:startup"):
+        loan_model_registry.start()
+        summary_refresher.start()
+        new_purchase_listeners.append(summary_refresher.enqueue)
+        sync_task = asyncio.create_task(transaction_sync_loop())
+        if settings.WARM_IMPORTS_ON_STARTUP:
+            threading.Thread(
+                target=warm_imports, name="warm-imports", daemon=True
+            ).start()
+
+    timings = startup_timings()
+    cold_start_ms = timings["import:api.app"] + timings["lifespan:startup"]
+    log = logger.warning if cold_start_ms > settings.STARTUP_BUDGET_MS else logger.info
+    log(f"Cold start {cold_start_ms:.1f} ms (budget {settings.STARTUP_BUDGET_MS} ms)")
 
+    yield
+    loan_model_registry.stop()
+    sync_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await sync_task
+    new_purchase_listeners.remove(summary_refresher.enqueue)
+    await summary_refresher.stop()
+    await close_http_client()
+    close_transaction_store()
+    plan_cache.close()
 
-app = FastAPI(title="Banking API", version="1.0")
+
+app = FastAPI(title="Banking API", version="1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,7 +64,24 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+
+@app.middleware("http")
+async def request_context_middleware(request: Request, call_next):
+    """Share one upstream-call memo across everything a request awaits"""
+    with request_scope() as ctx:
+        response = await call_next(request)
+    logger.debug(
+        f"{request.method} {request.url.path} upstream_calls={ctx.upstream_calls} "
+        f"deduplicated={ctx.deduplicated}"
+    )
+    response.headers["X-Upstream-Calls"] = str(ctx.upstream_calls)
+    return response
+
+
 app.include_router(transactionrouter, prefix="/transactions", tags=["Transactions"])
 app.include_router(loanrouter, prefix="/loans", tags=["Loans"])
 app.include_router(analyticsrouter, prefix="/analytics", tags=["AI Insights"])
 app.include_router(userrouter, prefix="/user", tags=["user info"])
+app.include_router(metricsrouter, prefix="/metrics", tags=["Metrics"])
+
+record("import:api.app", _import_started)
@@ -0,0 +1,85 @@
+"""Microbenchmark: per-object Nessie decoding vs bulk validation + fast encoding.
+
+Usage: python -m api.bench_serialization [--purchases N] [--repeat R]
+"""
+
+import argparse
+import json
+import time
+from fastapi.encoders import jsonable_encoder
+from api.database import transactions_adapter
+from api.models import TransactionInfo
+from api.responses import FastJSONResponse
+
+
+def make_payload(n: int) -> bytes:
+    return json.dumps(
+        [
+            {
+                "_id": f"{i:024x}",
+                "type": "merchant",
+                "merchant_id": f"{i % 40:024x}",
+                "payer_id": "67a8d2f99683f20dd518b7f1",
+                "purchase_date": f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+                "amount": i % 500,
+                "status": "executed",
+                "medium": "balance",
+                "description": f"purchase {i}",
+            }
+            for i in range(n)
+        ]
+    ).encode()
+
+
+def per_object_path(body: bytes) -> bytes:
+    """What the routes did before: build models one by one, then jsonable_encoder"""
+    transactions = [
+        TransactionInfo(
+            _id=t["_id"],
+            type=t["type"],
+            merchant_id=t["merchant_id"],
+            payer_id=t["payer_id"],
+            purchase_date=t["purchase_date"],
+            amount=t["amount"],
+            status=t["status"],
+            medium=t["medium"],
+            description=t["description"],
+        )
+        for t in json.loads(body)
+    ]
+    content = jsonable_encoder({"user_id": "u", "transactions": transactions})
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def bulk_path(body: bytes) -> bytes:
+    transactions = transactions_adapter.validate_json(body)
+    return FastJSONResponse({"user_id": "u", "transactions": transactions}).body
+
+
+def bench(fn, body: bytes, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(body)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--purchases", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    body = make_payload(args.purchases)
+    assert json.loads(per_object_path(body)) == json.loads(bulk_path(body))
+
+    old_ms = bench(per_object_path, body, args.repeat)
+    new_ms = bench(bulk_path, body, args.repeat)
+    print(f"{args.purchases} purchases, best of {args.repeat}:")
+    print(f"  per-object + jsonable_encoder: {old_ms:8.2f} ms")
+    print(f"  bulk validate + fast encode:   {new_ms:8.2f} ms  ({old_ms / new_ms:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,70 @@ class Settings(BaseSettings):
     OPENAI_KEY: str
     OPENAI_ORG: str
     C1_KEY: str
+
+    # Nessie (Capital One) HTTP client
+    C1_TIMEOUT: float = 5.0
+    C1_CONNECT_TIMEOUT: float = 2.0
+    C1_MAX_CONNECTIONS: int = 100
+    C1_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    C1_KEEPALIVE_EXPIRY: float = 30.0
+    C1_FANOUT_CONCURRENCY: int = 8
+
+    # Nessie read-through cache (TTLs in seconds, 0 disables caching)
+    C1_CACHE_MAXSIZE: int = 2048
+    C1_CACHE_TTL_CUSTOMER: float = 300.0
+    C1_CACHE_TTL_ACCOUNTS: float = 60.0
+    C1_CACHE_TTL_ACCOUNT: float = 15.0
+    C1_CACHE_TTL_PURCHASES: float = 60.0
+    C1_CACHE_TTL_LOANS: float = 120.0
+
+    # Local transaction store
+    TXN_STORE_PATH: str = "transactions.sqlite3"
+    TXN_STORE_MAX_STALENESS: float = 300.0
+    TXN_STORE_SYNC_INTERVAL: float = 60.0
+
+    # Per-request data gathering (seconds)
+    GATHER_BUDGET_S: float = 4.0
+    GATHER_TIMEOUT_NESSIE_S: float = 3.0
+    GATHER_TIMEOUT_SUPABASE_S: float = 2.0
+    GATHER_TIMEOUT_TRANSACTIONS_S: float = 3.5
+
+    # OpenAI
+    OPENAI_DEADLINE_S: float = 8.0
+    OPENAI_MAX_CONCURRENCY: int = 4
+
+    # Spending habits prompt
+    SPENDING_SUMMARY_TOKEN_BUDGET: int = 600
+    SPENDING_SUMMARY_TOP_K: int = 5
+
+    # Local spending metrics
+    METRICS_MONTHS: int = 12
+    METRICS_TOP_K: int = 5
+    METRICS_Z_THRESHOLD: float = 3.0
+
+    # Spending plan response cache
+    PLAN_CACHE_PATH: str = "plan_cache.sqlite3"
+    PLAN_CACHE_TTL: float = 7 * 24 * 3600.0
+    PLAN_CACHE_MAX_ENTRIES: int = 5000
+    PLAN_CACHE_TOUCH_BATCH: int = 64
+    PLAN_INCOME_BAND: int = 10000
+    PLAN_CREDIT_BAND: int = 50
+    PLAN_AGE_BAND: int = 5
+    PLAN_MAX_DEPENDENTS: int = 5
+
+    # Cold start
+    STARTUP_BUDGET_MS: float = 2000.0
+    WARM_IMPORTS_ON_STARTUP: bool = True
+
+    # Loan model
+    LOAN_MODEL_PATH: str = "ml/loan_model.pkl"
+    LOAN_MODEL_RELOAD_INTERVAL: float = 30.0
+
+    # Batch loan scoring
+    LOAN_SCORE_CHUNK_SIZE: int = 256
+    LOAN_SCORE_CONCURRENCY: int = 16
+    LOAN_SCORE_PREDICT_WORKERS: int = 2
+
     model_config = SettingsConfigDict(env_file=".env", extra="allow")
 
 
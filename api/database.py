@@ -1,20 +1,163 @@
-from supabase import create_client, Client
-from typing import List, Optional
-import requests
-import json
-from .config import settings
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import functools
+import threading
+import time
+import httpx
+from pydantic import TypeAdapter
+from .cache import MISSING, TTLCache
+from .config import logger, settings
+from .http_client import get_http_client
+from .request_context import clear_request_memo, record_upstream_call, single_flight
+from .transaction_store import get_transaction_store
 from .models import (
     AccountInfo,
     LoanInfo,
     TransactionInfo,
     CustomerInfo,
-    AddressInfo,
     CustomerAdditionalInfo,
 )
 
-supabase: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+if TYPE_CHECKING:
+    from supabase import Client
+
+_supabase: Optional["Client"] = None
+_supabase_lock = threading.Lock()
+
+
+def get_supabase() -> "Client":
+    """Supabase client, created (and supabase imported) on first use"""
+    global _supabase
+    with _supabase_lock:
+        if _supabase is None:
+            from supabase import create_client
+
+            _supabase = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+    return _supabase
+
 
 BASE_C1_URL = "http://api.nessieisreal.com"
+
+nessie_cache = TTLCache(maxsize=settings.C1_CACHE_MAXSIZE)
+
+# Whole Nessie lists are validated in a single pydantic-core pass
+transactions_adapter = TypeAdapter(List[TransactionInfo])
+accounts_adapter = TypeAdapter(List[AccountInfo])
+loans_adapter = TypeAdapter(List[LoanInfo])
+
+
+async def _c1_request(
+    method: str,
+    path: str,
+    payload: Optional[dict] = None,
+    timeout: Optional[float] = None,
+) -> httpx.Response:
+    """Send a request to Nessie over the pooled client, raising on HTTP errors"""
+    client = get_http_client()
+    record_upstream_call()
+    response = await client.request(
+        method,
+        f"{BASE_C1_URL}{path}",
+        params={"key": settings.C1_KEY},
+        json=payload,
+        timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+    )
+    response.raise_for_status()
+    return response
+
+
+async def _c1_get(path: str, timeout: Optional[float] = None) -> Any:
+    response = await _c1_request("GET", path, timeout=timeout)
+    return response.json()
+
+
+async def _c1_get_bytes(path: str, timeout: Optional[float] = None) -> bytes:
+    """Raw response body, for validating straight from JSON in one pass"""
+    response = await _c1_request("GET", path, timeout=timeout)
+    return response.content
+
+
+def _read_through(kind: str, ttl_setting: str):
+    """Serve a Nessie loader from nessie_cache, keyed on (kind, entity id).
+
+    Misses are single-flighted per request, so identical lookups issued
+    while the first one is still in flight share its result.
+    """
+
+    def decorator(load):
+        async def cached_load(key: tuple, entity_id: str, timeout: Optional[float]):
+            value = nessie_cache.get(key)
+            if value is not MISSING:
+                return value
+            value = await load(entity_id, timeout=timeout)
+            nessie_cache.set(key, value, getattr(settings, ttl_setting))
+            return value
+
+        @functools.wraps(load)
+        async def wrapper(entity_id: str, timeout: Optional[float] = None):
+            key = (kind, str(entity_id))
+            return await single_flight(
+                key, lambda: cached_load(key, entity_id, timeout)
+            )
+
+        return wrapper
+
+    return decorator
+
+
+def invalidate_c1_accounts(account_ids: List[str]) -> None:
+    """Drop cached reads that may be stale after a write touching these accounts"""
+    ids = set(account_ids)
+    nessie_cache.invalidate_where(
+        lambda key, value: (
+            key[0] in ("account", "purchases", "loans") and key[1] in ids
+        )
+        or (key[0] == "accounts" and any(a.id in ids for a in value))
+    )
+    clear_request_memo()
+
+
+class AccountResults(list):
+    """Items merged across a user's accounts, plus the accounts that failed to load"""
+
+    def __init__(self, items=(), failed_accounts: Optional[Dict[str, str]] = None):
+        super().__init__(items)
+        self.failed_accounts: Dict[str, str] = failed_accounts or {}
+
+
+def _failure_reason(error: Exception) -> str:
+    """Client-safe reason for a failed account; httpx messages carry the keyed URL"""
+    if isinstance(error, httpx.HTTPStatusError):
+        return f"HTTP {error.response.status_code}"
+    return type(error).__name__
+
+
+async def _fan_out_accounts(
+    accounts: List[AccountInfo], fetch: Callable[[str], Awaitable[list]]
+) -> AccountResults:
+    """Run fetch for every account concurrently and merge results in account order"""
+    semaphore = asyncio.Semaphore(settings.C1_FANOUT_CONCURRENCY)
+
+    async def fetch_one(account_id: str) -> list:
+        async with semaphore:
+            return await fetch(account_id)
+
+    results = await asyncio.gather(
+        *(fetch_one(account.id) for account in accounts), return_exceptions=True
+    )
+
+    merged = AccountResults()
+    for account, result in zip(accounts, results):
+        if isinstance(result, asyncio.CancelledError):
+            raise result
+        if isinstance(result, Exception):
+            logger.error(f"Error fetching account {account.id}: {result!r}")
+            merged.failed_accounts[account.id] = _failure_reason(result)
+        else:
+            merged.extend(result)
+    return merged
+
+
 # def get_user_loans(user_id: int) -> Optional[List[LoanInfo]]:
 #     """Fetch all loans for a given user ID"""
 #     response = (
@@ -49,142 +192,175 @@ BASE_C1_URL = "http://api.nessieisreal.com"
 #     return None  # Return None if no loans are found
 
 
-def get_c1_account_transactions(account_id: str) -> Optional[List[TransactionInfo]]:
-    url = f"{BASE_C1_URL}/accounts/{account_id}/purchases?key={settings.C1_KEY}"
+@_read_through("purchases", "C1_CACHE_TTL_PURCHASES")
+async def _fetch_c1_account_transactions(
+    account_id: str, timeout: Optional[float] = None
+) -> List[TransactionInfo]:
+    content = await _c1_get_bytes(f"/accounts/{account_id}/purchases", timeout=timeout)
+    return transactions_adapter.validate_json(content)
+
 
+async def get_c1_account_transactions(
+    account_id: str, timeout: Optional[float] = None
+) -> Optional[List[TransactionInfo]]:
     try:
-        response = requests.get(url, headers={"Content-Type": "application/json"})
-        response.raise_for_status()
-
-        transactions_data = response.json()
-        return [
-            TransactionInfo(
-                _id=t["_id"],
-                type=t["type"],
-                merchant_id=t["merchant_id"],
-                payer_id=t["payer_id"],
-                purchase_date=t["purchase_date"],
-                amount=t["amount"],
-                status=t["status"],
-                medium=t["medium"],
-                description=t["description"],
-            )
-            for t in transactions_data
-        ]
+        return await _fetch_c1_account_transactions(account_id, timeout=timeout)
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"Error fetching transactions: {e}")
         return None
 
 
-def get_c1_accounts(user_id: str) -> Optional[List[AccountInfo]]:
-    url = f"{BASE_C1_URL}/customers/{user_id}/accounts?key={settings.C1_KEY}"
+@_read_through("accounts", "C1_CACHE_TTL_ACCOUNTS")
+async def _fetch_c1_accounts(
+    user_id: str, timeout: Optional[float] = None
+) -> List[AccountInfo]:
+    content = await _c1_get_bytes(f"/customers/{user_id}/accounts", timeout=timeout)
+    return accounts_adapter.validate_json(content)
+
 
+async def get_c1_accounts(
+    user_id: str, timeout: Optional[float] = None
+) -> Optional[List[AccountInfo]]:
     try:
-        response = requests.get(url, headers={"Content-Type": "application/json"})
-        response.raise_for_status()
-
-        account_data = response.json()
-        x = [
-            AccountInfo(
-                id=a["_id"],
-                type=a["type"],
-                nickname=a["nickname"],
-                rewards=a["rewards"],
-                balance=a["balance"],
-                account_number=a["account_number"],
-                customer_id=a["customer_id"],
-            )
-            for a in account_data
-        ]
-        return x
-    except requests.exceptions.RequestException as e:
+        return await _fetch_c1_accounts(user_id, timeout=timeout)
+    except httpx.HTTPError as e:
         print(f"Error fetching accounts: {e}")
         return None
 
 
-def get_c1_account_info(account_id: str) -> Optional[AccountInfo]:
-    url = f"{BASE_C1_URL}/accounts/{account_id}?key={settings.C1_KEY}"
+@_read_through("account", "C1_CACHE_TTL_ACCOUNT")
+async def _fetch_c1_account_info(
+    account_id: str, timeout: Optional[float] = None
+) -> AccountInfo:
+    content = await _c1_get_bytes(f"/accounts/{account_id}", timeout=timeout)
+    return AccountInfo.model_validate_json(content)
+
+
+async def get_c1_account_info(
+    account_id: str, timeout: Optional[float] = None
+) -> Optional[AccountInfo]:
     try:
-        response = requests.get(url, headers={"Content-Type": "application/json"})
-        response.raise_for_status()
-
-        a = response.json()
-        return AccountInfo(
-            id=a["_id"],
-            type=a["type"],
-            nickname=a["merchant_id"],
-            rewards=a["rewards"],
-            balance=a["balance"],
-            account_number=a["account_number"],
-            customer_id=a["customer_id"],
-        )
+        return await _fetch_c1_account_info(account_id, timeout=timeout)
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"Error fetching laons: {e}")
         return None
 
 
-def get_c1_user_transactions(user_id: str) -> Optional[List[TransactionInfo]]:
-    accounts = get_c1_accounts(user_id=user_id)
+# Called with a customer_id whenever a sync changes their stored purchases
+new_purchase_listeners: List[Callable[[str], Any]] = []
+
+
+async def sync_c1_account_transactions(account_id: str, customer_id: str) -> int:
+    """Mirror an account's purchases into the local store, returning rows changed"""
+    purchases = await _c1_get(f"/accounts/{account_id}/purchases")
+    changes = await asyncio.to_thread(
+        get_transaction_store().apply_sync, account_id, customer_id, purchases
+    )
+    if changes:
+        for listener in new_purchase_listeners:
+            listener(customer_id)
+    return changes
+
+
+async def get_c1_user_transactions(
+    user_id: str, start_date: Optional[str] = None, end_date: Optional[str] = None
+) -> Optional[AccountResults]:
+    """User purchases served from the local store, syncing stale accounts first"""
+    accounts = await get_c1_accounts(user_id=user_id)
     if accounts is None:
         return None
-    transactions = []
-    for account in accounts:
-        curr_account_transactions = get_c1_account_transactions(account_id=account.id)
-        if curr_account_transactions is not None:
-            transactions.extend(curr_account_transactions)
-    return transactions
 
+    store = get_transaction_store()
+    account_ids = [account.id for account in accounts]
+    synced_at = await asyncio.to_thread(store.synced_at, account_ids)
+    cutoff = time.time() - settings.TXN_STORE_MAX_STALENESS
+    stale = [a for a in accounts if synced_at.get(a.id, 0.0) < cutoff]
 
-def get_c1_account_loans(account_id: str) -> Optional[List[LoanInfo]]:
-    url = f"{BASE_C1_URL}/accounts/{account_id}/loans?key={settings.C1_KEY}"
-    try:
-        response = requests.get(url, headers={"Content-Type": "application/json"})
-        response.raise_for_status()
-
-        loan_data = response.json()
-        return [
-            LoanInfo(
-                _id=l["_id"],
-                type=l["type"],
-                creation_date=l["creation_date"],
-                status=l["status"],
-                credit_score=l["credit_score"],
-                monthly_payment=l["monthly_payment"],
-                amount=l["amount"],
-                description=l["description"],
+    customers = {account.id: account.customer_id for account in accounts}
+
+    async def sync_account(account_id: str) -> list:
+        await single_flight(
+            ("sync", account_id),
+            lambda: sync_c1_account_transactions(account_id, customers[account_id]),
+        )
+        return []
+
+    synced = await _fan_out_accounts(stale, sync_account)
+
+    rows = await asyncio.to_thread(
+        store.query,
+        account_ids=account_ids,
+        start_date=start_date,
+        end_date=end_date,
+    )
+    order = {account_id: idx for idx, account_id in enumerate(account_ids)}
+    rows.sort(key=lambda row: order[row["account_id"]])
+    return AccountResults(
+        transactions_adapter.validate_python(rows),
+        failed_accounts=synced.failed_accounts,
+    )
+
+
+async def transaction_sync_loop() -> None:
+    """Background task keeping every known account in the local store fresh"""
+    while True:
+        await asyncio.sleep(settings.TXN_STORE_SYNC_INTERVAL)
+        try:
+            stale = await asyncio.to_thread(
+                get_transaction_store().stale_accounts,
+                settings.TXN_STORE_SYNC_INTERVAL,
             )
-            for l in loan_data
-        ]
+            for account in stale:
+                try:
+                    await sync_c1_account_transactions(
+                        account["account_id"], account["customer_id"]
+                    )
+                except Exception as e:
+                    print(f"Error syncing account {account['account_id']}: {e!r}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Transaction sync failed: {e!r}")
+
+
+@_read_through("loans", "C1_CACHE_TTL_LOANS")
+async def _fetch_c1_account_loans(
+    account_id: str, timeout: Optional[float] = None
+) -> List[LoanInfo]:
+    content = await _c1_get_bytes(f"/accounts/{account_id}/loans", timeout=timeout)
+    return loans_adapter.validate_json(content)
+
+
+async def get_c1_account_loans(
+    account_id: str, timeout: Optional[float] = None
+) -> Optional[List[LoanInfo]]:
+    try:
+        return await _fetch_c1_account_loans(account_id, timeout=timeout)
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"Error fetching laons: {e}")
         return None
 
 
-def get_c1_user_loans(user_id: str) -> Optional[List[LoanInfo]]:
-    accounts = get_c1_accounts(user_id=user_id)
+async def get_c1_user_loans(user_id: str) -> Optional[AccountResults]:
+    accounts = await get_c1_accounts(user_id=user_id)
     if accounts is None:
         return None
-    loans = []
-    for account in accounts:
-        curr_account_loans = get_c1_account_loans(account_id=account.id)
-        if curr_account_loans is not None:
-            loans.extend(curr_account_loans)
-    return loans
+    return await _fan_out_accounts(accounts, _fetch_c1_account_loans)
 
 
-def create_c1_transfer_account(
+async def create_c1_transfer_account(
     account_id: str,
     medium: str,
     payee_id: str,
     amount: float,
-    transaction_date: Optional[str],
-    status: Optional[str],
-    description: Optional[str],
+    transaction_date: Optional[str] = None,
+    status: Optional[str] = None,
+    description: Optional[str] = None,
+    timeout: Optional[float] = None,
 ):
-    url = f"{BASE_C1_URL}/accounts/{account_id}/transfers?key={settings.C1_KEY}"
     payload = {
         "medium": medium,
         "payee_id": payee_id,
@@ -197,18 +373,21 @@ def create_c1_transfer_account(
     if description:
         payload["description"] = description
 
-    headers = {"Content-Type": "application/json"}
-
     try:
-        response = requests.post(url, data=json.dumps(payload), headers=headers)
-        response.raise_for_status()  # Raise error for non-201 responses
-
+        response = await _c1_request(
+            "POST",
+            f"/accounts/{account_id}/transfers",
+            payload=payload,
+            timeout=timeout,
+        )  # Raise error for non-201 responses
+
+        invalidate_c1_accounts([account_id, payee_id])
         return response.json()
 
-    except requests.exceptions.HTTPError as http_err:
+    except httpx.HTTPStatusError as http_err:
         print(f"HTTP error occurred: {http_err}")
         try:
-            error_response = response.json()
+            error_response = http_err.response.json()
             return {
                 "error": {
                     "code": error_response.get("code"),
@@ -216,10 +395,10 @@ def create_c1_transfer_account(
                     "fields": error_response.get("fields"),
                 }
             }
-        except json.JSONDecodeError:
+        except ValueError:
             return {"error": {"message": "Unknown error occurred"}}
 
-    except requests.exceptions.RequestException as req_err:
+    except httpx.RequestError as req_err:
         print(f"Request error: {req_err}")
         return {"error": {"message": "Request failed"}}
 
@@ -228,34 +407,37 @@ def create_c1_transfer_account(
         return {"error": {"message": "An unexpected error occurred"}}
 
 
-def get_c1_customer(user_id: str) -> Optional[CustomerInfo]:
-    url = f"{BASE_C1_URL}/customers/{user_id}?key={settings.C1_KEY}"
+@_read_through("customer", "C1_CACHE_TTL_CUSTOMER")
+async def _fetch_c1_customer(
+    user_id: str, timeout: Optional[float] = None
+) -> CustomerInfo:
+    content = await _c1_get_bytes(f"/customers/{user_id}", timeout=timeout)
+    return CustomerInfo.model_validate_json(content)
+
+
+async def get_c1_customer(
+    user_id: str, timeout: Optional[float] = None
+) -> Optional[CustomerInfo]:
     try:
-        response = requests.get(url, headers={"Content-Type": "application/json"})
-        response.raise_for_status()
-
-        customer_data = response.json()
-        return CustomerInfo(
-            _id=customer_data["_id"],
-            first_name=customer_data["first_name"],
-            last_name=customer_data["last_name"],
-            address=AddressInfo(
-                street_number=customer_data["address"]["street_number"],
-                street_name=customer_data["address"]["street_name"],
-                city=customer_data["address"]["city"],
-                state=customer_data["address"]["state"],
-                zip=customer_data["address"]["zip"],
-            ),
-        )
+        return await _fetch_c1_customer(user_id, timeout=timeout)
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"Error fetching Customer: {e}")
         return None
 
 
-def get_sb_customer_info(customer_id: str) -> Optional[CustomerAdditionalInfo]:
+async def get_sb_customer_info(customer_id: str) -> Optional[CustomerAdditionalInfo]:
+    return await single_flight(
+        ("sb_customer", str(customer_id)),
+        lambda: asyncio.to_thread(_fetch_sb_customer_info, customer_id),
+    )
+
+
+def _fetch_sb_customer_info(customer_id: str) -> Optional[CustomerAdditionalInfo]:
+    record_upstream_call()
     response = (
-        supabase.table("customer_additional")
+        get_supabase()
+        .table("customer_additional")
         .select("*")
         .eq("customer_id", customer_id)
         .single()
@@ -0,0 +1,52 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Dict, Optional, Tuple
+
+
+class GatherResult:
+    """Values from gather_with_budget plus how each source fared"""
+
+    def __init__(self):
+        self.values: Dict[str, Any] = {}
+        self.sources: Dict[str, Dict[str, Any]] = {}
+
+    def __getitem__(self, name: str) -> Any:
+        return self.values.get(name)
+
+    def ok(self, *names: str) -> bool:
+        return all(self.sources[name]["status"] == "ok" for name in names)
+
+
+async def gather_with_budget(
+    calls: Dict[str, Tuple[Awaitable, Optional[float]]], budget: float
+) -> GatherResult:
+    """Await independent calls concurrently under one overall latency budget.
+
+    calls maps a source name to (awaitable, own timeout or None). Each source
+    gets min(own timeout, budget); sources that time out or raise yield None
+    and are recorded in result.sources as "timeout" or "error" with elapsed ms.
+    """
+    started = time.perf_counter()
+    result = GatherResult()
+
+    async def run(name: str, awaitable: Awaitable, timeout: Optional[float]) -> None:
+        limit = budget if timeout is None else min(timeout, budget)
+        try:
+            result.values[name] = await asyncio.wait_for(awaitable, limit)
+            status = "ok"
+        except asyncio.TimeoutError:
+            result.values[name] = None
+            status = "timeout"
+        except Exception as e:
+            result.values[name] = None
+            status = "error"
+            result.sources[name] = {"error": str(e) or type(e).__name__}
+        result.sources.setdefault(name, {}).update(
+            status=status, ms=round((time.perf_counter() - started) * 1000, 1)
+        )
+
+    await asyncio.gather(
+        *(run(name, awaitable, timeout) for name, (awaitable, timeout) in calls.items())
+    )
+    result.sources = {name: result.sources[name] for name in calls}
+    return result
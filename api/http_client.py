@@ -0,0 +1,31 @@
+import httpx
+from typing import Optional
+from .config import settings
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared keep-alive client used for all Nessie calls"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            headers={"Content-Type": "application/json"},
+            timeout=httpx.Timeout(
+                settings.C1_TIMEOUT, connect=settings.C1_CONNECT_TIMEOUT
+            ),
+            limits=httpx.Limits(
+                max_connections=settings.C1_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.C1_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.C1_KEEPALIVE_EXPIRY,
+            ),
+        )
+    return _client
+
+
+async def close_http_client() -> None:
+    """Close the shared client and release pooled connections"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,36 @@
+import importlib
+import threading
+from types import ModuleType
+from typing import Any
+
+
+class LazyModule(ModuleType):
+    """Stand-in for module `name` that imports it on first attribute access.
+
+    The import goes through importlib.import_module under a lock, so threads
+    touching the module at the same time (the warm-up thread, the model
+    registry, request handlers) all wait for one fully executed module.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self._lock = threading.Lock()
+        self._module: Any = None
+
+    def _load(self) -> ModuleType:
+        with self._lock:
+            if self._module is None:
+                self._module = importlib.import_module(self.__name__)
+        return self._module
+
+    def __getattr__(self, attr: str) -> Any:
+        module = self._module if self._module is not None else self._load()
+        value = getattr(module, attr)
+        # Later lookups of the same name skip __getattr__
+        self.__dict__[attr] = value
+        return value
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Return module `name`, deferring its import until first attribute access"""
+    return LazyModule(name)
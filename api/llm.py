@@ -0,0 +1,209 @@
+import asyncio
+import hashlib
+import time
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional
+from .config import settings
+
+if TYPE_CHECKING:
+    import openai
+
+LLM_MODEL = "gpt-4o-mini"
+
+_async_client: Optional["openai.AsyncOpenAI"] = None
+
+
+def get_async_openai_client() -> "openai.AsyncOpenAI":
+    """OpenAI client, created (and openai imported) on first use"""
+    global _async_client
+    if _async_client is None:
+        import openai
+
+        _async_client = openai.AsyncOpenAI(api_key=settings.OPENAI_KEY)
+    return _async_client
+
+
+class LLMLimiter:
+    """Global cap on concurrent OpenAI calls; extra callers queue for a slot.
+
+    Tracks queue depth and how long callers waited so bursts show up in
+    /metrics/llm before they show up as upstream rate-limit errors.
+    """
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.waiting = 0
+        self.max_waiting = 0
+        self.in_flight = 0
+        self.started = 0
+        self.coalesced = 0
+        self.total_wait_s = 0.0
+        self.max_wait_s = 0.0
+
+    @asynccontextmanager
+    async def slot(self):
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        wait_s = time.perf_counter() - queued_at
+        self.started += 1
+        self.total_wait_s += wait_s
+        self.max_wait_s = max(self.max_wait_s, wait_s)
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "max_queue_depth": self.max_waiting,
+            "started": self.started,
+            "coalesced": self.coalesced,
+            "avg_wait_ms": round(self.total_wait_s / self.started * 1000, 1)
+            if self.started
+            else 0.0,
+            "max_wait_ms": round(self.max_wait_s * 1000, 1),
+        }
+
+
+llm_limiter = LLMLimiter(settings.OPENAI_MAX_CONCURRENCY)
+
+# In-flight upstream calls keyed on prompt hash; identical concurrent prompts share one
+_inflight_completions: Dict[str, asyncio.Future] = {}
+_inflight_streams: Dict[str, "_SharedStream"] = {}
+
+
+def _prompt_key(prompt: str, model: str) -> str:
+    return hashlib.sha256(f"{model}\0{prompt}".encode()).hexdigest()
+
+
+async def _complete(prompt: str, model: str) -> str:
+    async with llm_limiter.slot():
+        response = await get_async_openai_client().chat.completions.create(
+            model=model, messages=[{"role": "user", "content": prompt}]
+        )
+    return response.choices[0].message.content
+
+
+async def complete(prompt: str, model: str = LLM_MODEL) -> str:
+    """Single-turn completion without blocking the event loop"""
+    key = _prompt_key(prompt, model)
+    future = _inflight_completions.get(key)
+    if future is None:
+        future = asyncio.ensure_future(_complete(prompt, model))
+        _inflight_completions[key] = future
+        future.add_done_callback(lambda _: _inflight_completions.pop(key, None))
+    else:
+        llm_limiter.coalesced += 1
+
+    # Shield so one cancelled caller does not cancel the shared call for the others
+    return await asyncio.shield(future)
+
+
+async def _stream(prompt: str, model: str) -> AsyncIterator[str]:
+    async with llm_limiter.slot():
+        stream = await get_async_openai_client().chat.completions.create(
+            model=model, messages=[{"role": "user", "content": prompt}], stream=True
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class _SharedStream:
+    """One upstream stream replayed to every subscriber, late joiners included.
+
+    The upstream is cancelled once the last subscriber goes away.
+    """
+
+    def __init__(self, key: str, source: AsyncIterator[str]):
+        self.key = key
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self._changed = asyncio.Event()
+        self._task = asyncio.ensure_future(self._pump(source))
+
+    async def _pump(self, source: AsyncIterator[str]) -> None:
+        try:
+            async for chunk in source:
+                self.chunks.append(chunk)
+                self._notify()
+        except asyncio.CancelledError:
+            self.error = asyncio.CancelledError()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            _inflight_streams.pop(self.key, None)
+            self._notify()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        self.subscribers += 1
+        try:
+            sent = 0
+            while True:
+                while sent < len(self.chunks):
+                    yield self.chunks[sent]
+                    sent += 1
+                if self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                await self._changed.wait()
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self.done:
+                self._task.cancel()
+
+
+async def stream_completion(prompt: str, model: str = LLM_MODEL) -> AsyncIterator[str]:
+    """Yield completion text fragments as the model produces them"""
+    key = _prompt_key(prompt, model)
+    shared = _inflight_streams.get(key)
+    if shared is None:
+        shared = _SharedStream(key, _stream(prompt, model))
+        _inflight_streams[key] = shared
+    else:
+        llm_limiter.coalesced += 1
+    async for chunk in shared.subscribe():
+        yield chunk
+
+
+def llm_stats() -> dict:
+    """Limiter counters plus how many distinct prompts are in flight"""
+    return {
+        **llm_limiter.stats(),
+        "inflight_prompts": len(_inflight_completions) + len(_inflight_streams),
+    }
+
+
+async def iter_until(chunks: AsyncIterator[str], deadline: float) -> AsyncIterator[str]:
+    """Relay chunks until the loop-time deadline, then raise asyncio.TimeoutError"""
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError
+            try:
+                yield await asyncio.wait_for(chunks.__anext__(), remaining)
+            except StopAsyncIteration:
+                return
+    finally:
+        await chunks.aclose()
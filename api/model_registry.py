@@ -0,0 +1,142 @@
+import hashlib
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+from .config import logger
+from .lazy import lazy_import
+
+joblib = lazy_import("joblib")
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+class LoadedModel:
+    __slots__ = ("model", "version", "path", "inode", "loaded_at")
+
+    def __init__(self, model: Any, version: str, path: str, inode: int):
+        self.model = model
+        self.version = version
+        self.path = path
+        self.inode = inode
+        self.loaded_at = time.time()
+
+
+def _file_version(stat: os.stat_result) -> str:
+    return hashlib.sha1(
+        f"{stat.st_ino}:{stat.st_mtime_ns}:{stat.st_size}".encode()
+    ).hexdigest()[:12]
+
+
+class ModelRegistry:
+    """Loads a joblib model off the request path and hot-swaps it when the file changes.
+
+    Array data is memory-mapped (mmap_mode="r") so workers loading the same
+    file share pages. The current model is swapped by replacing a single
+    reference: predictions already running keep the LoadedModel they started
+    with, and every prediction reports the version it was made with.
+
+    Publish a new model by writing it to a temporary file and os.replace()-ing
+    it over path. Rewriting the file in place (joblib.dump to the same path)
+    would change pages the old model still has mapped, so while memory-mapped
+    a changed file with the same inode is not reloaded.
+    """
+
+    def __init__(self, path: str, reload_interval: float = 30.0, mmap_mode: str = "r"):
+        self.path = path
+        self.reload_interval = reload_interval
+        self.mmap_mode = mmap_mode
+        self.last_error: Optional[str] = None
+        self._current: Optional[LoadedModel] = None
+        self._load_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def current(self) -> Optional[LoadedModel]:
+        return self._current
+
+    @property
+    def ready(self) -> bool:
+        return self._current is not None
+
+    def load_if_changed(self) -> bool:
+        """Load the model file if it differs from the current one; True on swap"""
+        with self._load_lock:
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                if self.last_error is None:
+                    logger.warning(
+                        f"{os.path.basename(self.path)} not found at {self.path}. Loan approval functionality will be limited."
+                    )
+                self.last_error = "model file not found"
+                return False
+
+            version = _file_version(stat)
+            current = self._current
+            if current is not None and current.version == version:
+                return False
+            if (
+                current is not None
+                and self.mmap_mode is not None
+                and current.inode == stat.st_ino
+            ):
+                if self.last_error is None:
+                    logger.warning(
+                        f"{self.path} was rewritten in place; replace it with "
+                        "os.replace() to hot-swap the loan model"
+                    )
+                self.last_error = "model file rewritten in place"
+                return False
+
+            try:
+                model = joblib.load(self.path, mmap_mode=self.mmap_mode)
+            except Exception as e:
+                logger.error(f"Error loading loan model: {str(e)}")
+                self.last_error = str(e)
+                return False
+
+            # The file was rewritten while we read it; pick it up on the next pass
+            if _file_version(os.stat(self.path)) != version:
+                return False
+
+            self._current = LoadedModel(model, version, self.path, stat.st_ino)
+            self.last_error = None
+            logger.info(f"Loan model {version} loaded successfully.")
+            return True
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.load_if_changed()
+            self._stop.wait(self.reload_interval)
+
+    def start(self) -> None:
+        """Load in a background thread and keep polling the file for changes"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="model-registry", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def predict(self, features: "np.ndarray") -> Tuple["np.ndarray", str]:
+        current = self._current
+        if current is None:
+            raise RuntimeError("Loan model is not loaded")
+        return current.model.predict(features), current.version
+
+    def status(self) -> Dict[str, Any]:
+        current = self._current
+        return {
+            "ready": current is not None,
+            "version": current.version if current else None,
+            "path": self.path,
+            "loaded_at": current.loaded_at if current else None,
+            "last_error": self.last_error,
+        }
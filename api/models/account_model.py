@@ -1,10 +1,10 @@
-from pydantic import BaseModel
+from pydantic import AliasChoices, BaseModel, Field
 from typing import Optional
 from datetime import datetime
 
 
 class AccountInfo(BaseModel):
-    id: str
+    id: str = Field(validation_alias=AliasChoices("id", "_id"))
     type: str
     nickname: str
     rewards: int
@@ -0,0 +1,63 @@
+import asyncio
+from typing import Awaitable, Callable, List, Optional, Set
+from .config import logger
+
+
+class BackgroundRefresher:
+    """Deduplicating queue of keys that worker tasks regenerate off the request path.
+
+    A key enqueued while it is already waiting is not queued twice, so a
+    burst of triggers for the same user produces a single refresh.
+    """
+
+    def __init__(self, refresh: Callable[[str], Awaitable[None]], workers: int = 1):
+        self.refresh = refresh
+        self.workers = workers
+        self.completed = 0
+        self.failed = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._pending: Set[str] = set()
+        self._tasks: List[asyncio.Task] = []
+
+    def enqueue(self, key: str) -> bool:
+        if self._queue is None or key in self._pending:
+            return False
+        self._pending.add(key)
+        self._queue.put_nowait(key)
+        return True
+
+    async def _work(self) -> None:
+        while True:
+            key = await self._queue.get()
+            self._pending.discard(key)
+            try:
+                await self.refresh(key)
+                self.completed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Background refresh failed for {key}: {e!r}")
+            finally:
+                self._queue.task_done()
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        self._pending.clear()
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self._pending),
+            "completed": self.completed,
+            "failed": self.failed,
+        }
@@ -0,0 +1,63 @@
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterator, Optional
+
+
+class RequestContext:
+    """Upstream-call bookkeeping shared by everything running inside one request"""
+
+    def __init__(self):
+        self.calls: Dict[Hashable, asyncio.Future] = {}
+        self.upstream_calls = 0
+        self.deduplicated = 0
+
+
+_current: ContextVar[Optional[RequestContext]] = ContextVar(
+    "request_context", default=None
+)
+
+
+def current_request_context() -> Optional[RequestContext]:
+    return _current.get()
+
+
+@contextmanager
+def request_scope() -> Iterator[RequestContext]:
+    """Install a fresh RequestContext for the duration of the block"""
+    ctx = RequestContext()
+    token = _current.set(ctx)
+    try:
+        yield ctx
+    finally:
+        _current.reset(token)
+
+
+def record_upstream_call() -> None:
+    ctx = _current.get()
+    if ctx is not None:
+        ctx.upstream_calls += 1
+
+
+def clear_request_memo() -> None:
+    """Forget memoized results, e.g. after a write in the same request"""
+    ctx = _current.get()
+    if ctx is not None:
+        ctx.calls.clear()
+
+
+async def single_flight(key: Hashable, load: Callable[[], Awaitable[Any]]) -> Any:
+    """Run load once per key per request; concurrent and later callers share it"""
+    ctx = _current.get()
+    if ctx is None:
+        return await load()
+
+    future = ctx.calls.get(key)
+    if future is None:
+        future = asyncio.ensure_future(load())
+        ctx.calls[key] = future
+    else:
+        ctx.deduplicated += 1
+
+    # Shield so one cancelled caller does not cancel the shared call for the others
+    return await asyncio.shield(future)
@@ -0,0 +1,133 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+from .cache import MISSING, TTLCache
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access);
+"""
+
+
+class PersistentResponseCache:
+    """JSON response cache persisted to SQLite, fronted by an in-memory TTLCache.
+
+    Entries expire ttl seconds after they were created; once the table holds
+    more than max_entries rows the least recently read ones are evicted.
+    Memory hits still count as reads: their last_access is written back once
+    touch_batch keys are pending, and always before an eviction.
+
+    get() and set() touch SQLite, so call them from a worker thread; both
+    tiers are guarded by one lock, since several threads may run them at once.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: float,
+        max_entries: int,
+        memory_size: int = 1024,
+        touch_batch: int = 64,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.touch_batch = touch_batch
+        self.memory = TTLCache(maxsize=memory_size)
+        self.disk_hits = 0
+        self.disk_evictions = 0
+        self._lock = threading.Lock()
+        self._touched: Dict[str, float] = {}  # key -> last memory hit, not yet on disk
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def get(self, key: str) -> Any:
+        """Cached value for key, or MISSING"""
+        now = time.time()
+        with self._lock:
+            value = self.memory.get(key)
+            if value is not MISSING:
+                self._touched[key] = now
+                if len(self._touched) >= self.touch_batch:
+                    with self._db() as conn:
+                        self._flush_touched(conn)
+                return value
+
+            with self._db() as conn:
+                self._flush_touched(conn)
+                row = conn.execute(
+                    "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return MISSING
+                if row[1] + self.ttl <= now:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    return MISSING
+                conn.execute(
+                    "UPDATE responses SET last_access = ? WHERE key = ?", (now, key)
+                )
+
+            self.disk_hits += 1
+            value = json.loads(row[0])
+            self.memory.set(key, value, row[1] + self.ttl - now)
+        return value
+
+    def _flush_touched(self, conn: sqlite3.Connection) -> None:
+        """Write pending memory-hit times to last_access; caller holds _lock"""
+        if self._touched:
+            conn.executemany(
+                "UPDATE responses SET last_access = ? WHERE key = ?",
+                [(ts, key) for key, ts in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def set(self, key: str, value: Any) -> None:
+        now = time.time()
+        with self._lock, self._db() as conn:
+            self._flush_touched(conn)
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now),
+            )
+            excess = (
+                conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+                - self.max_entries
+            )
+            if excess > 0:
+                conn.execute(
+                    "DELETE FROM responses WHERE key IN (SELECT key FROM responses "
+                    "ORDER BY last_access LIMIT ?)",
+                    (excess,),
+                )
+                self.disk_evictions += excess
+            self.memory.set(key, value, self.ttl)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                with self._conn as conn:
+                    self._flush_touched(conn)
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "memory": self.memory.stats(),
+                "disk_hits": self.disk_hits,
+                "disk_evictions": self.disk_evictions,
+            }
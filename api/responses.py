@@ -0,0 +1,19 @@
+from typing import Any
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+
+_any_adapter = TypeAdapter(Any)
+
+
+class FastJSONResponse(Response):
+    """JSON response encoded by pydantic-core in one pass.
+
+    Returning it from a route skips FastAPI's response_model re-validation
+    and jsonable_encoder; pydantic models nested anywhere in the content are
+    serialized with their own compiled serializers.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return _any_adapter.dump_json(content)
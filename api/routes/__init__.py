@@ -1,11 +1,13 @@
 from .analytics import router as analyticsrouter
 from .loan import router as loanrouter
+from .metrics import router as metricsrouter
 from .transactions import router as transactionrouter
 from .user import router as userrouter
 
 __all__ = [
     "analyticsrouter",
     "loanrouter",
+    "metricsrouter",
     "transactionrouter",
     "userrouter",
 ]
@@ -1,20 +1,143 @@
 from fastapi import APIRouter, Request
-from fastapi.responses import JSONResponse
-import openai
+from fastapi.responses import JSONResponse, StreamingResponse
+import asyncio
 import json
-from pydantic import BaseModel
+import time
+from pydantic import BaseModel, Field
+from typing import Dict, Optional, Set
+from ..cache import MISSING
 from ..config import settings, logger
+from ..gather import GatherResult, gather_with_budget
+from ..refresher import BackgroundRefresher
+from ..request_context import request_scope
 from ..database import get_c1_customer, get_c1_user_transactions, get_sb_customer_info
+from ..llm import complete, iter_until, stream_completion
+from ..models import CustomerAdditionalInfo
+from ..response_cache import PersistentResponseCache
+from ..spending_metrics import compute_spending_metrics
+from ..spending_summary import summarize_spending
+from ..transaction_batch import TransactionBatch, to_day
+from ..transaction_store import get_transaction_store
 
 
 router = APIRouter()
 
+plan_cache = PersistentResponseCache(
+    settings.PLAN_CACHE_PATH,
+    ttl=settings.PLAN_CACHE_TTL,
+    max_entries=settings.PLAN_CACHE_MAX_ENTRIES,
+    touch_batch=settings.PLAN_CACHE_TOUCH_BATCH,
+)
 
-open_ai_client = openai.OpenAI(api_key=settings.OPENAI_KEY)
+
+class SpendingMetricsRequest(BaseModel):
+    user_id: str
+    # months sizes the per-month arrays, so both are bounded
+    months: int = Field(settings.METRICS_MONTHS, ge=1, le=120)
+    top_k: int = Field(settings.METRICS_TOP_K, ge=0, le=100)
+    as_of: Optional[str] = None
 
 
 class UserSpendingHabitsRequest(BaseModel):
     user_id: str
+    stream: bool = False
+    force_refresh: bool = False
+
+
+def _fallback_summary(batch: TransactionBatch) -> str:
+    """Plain spending summary used when the model misses its deadline"""
+    if not len(batch):
+        return "You don't have any purchases on record yet."
+    months, monthly_totals = batch.monthly_totals()
+    top = batch.top_merchants(1)
+    summary = (
+        f"You've made {len(batch)} purchases totalling ${batch.total():,.2f}"
+        f", about ${monthly_totals.mean():,.2f} per month."
+        if len(months)
+        else f"You've made {len(batch)} purchases totalling ${batch.total():,.2f}."
+    )
+    if top:
+        summary += f" Your biggest merchant accounts for ${top[0][1]:,.2f} of that."
+    return summary
+
+
+def _plan_profile(info: CustomerAdditionalInfo) -> Dict[str, int]:
+    """The fields the plan prompt uses, bucketed so similar customers share a plan"""
+
+    def band(value: int, width: int) -> int:
+        return int(value // width * width)
+
+    return {
+        "dependents": min(info.number_of_dependents, settings.PLAN_MAX_DEPENDENTS),
+        "credit_score": band(info.credit_score, settings.PLAN_CREDIT_BAND),
+        "income": band(info.income, settings.PLAN_INCOME_BAND),
+        "age": band(info.age, settings.PLAN_AGE_BAND),
+    }
+
+
+def _sources_unavailable(gathered: GatherResult) -> JSONResponse:
+    return JSONResponse(
+        status_code=504,
+        content={
+            "result": {
+                "error": "Upstream Timeout",
+                "message": "Some data sources did not respond in time",
+                "sources": gathered.sources,
+            }
+        },
+    )
+
+
+def _sse(payload: dict) -> str:
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+def _spending_habits_prompt(
+    additional_customer_info: CustomerAdditionalInfo, batch: TransactionBatch
+) -> str:
+    spending_str = summarize_spending(batch)
+    user_info_str = f"USER - dependents: {additional_customer_info.number_of_dependents}, credit_score: {additional_customer_info.credit_score}, income: {additional_customer_info.income}, age: {additional_customer_info.age}"
+    return f"Analyze the following spending summary and user info and summarize spending habits in 2 sentences. Speak directly to the user as if you are a customer representative: \n USER {user_info_str} \n SPENDING SUMMARY \n{spending_str} \n\n Respond as if you are speaking to the user directly, using 'you' and 'your' instead of 'the user'."
+
+
+async def _store_summary(user_id: str, summary: str, data_version: str) -> None:
+    await asyncio.to_thread(
+        get_transaction_store().put_summary, user_id, summary, data_version
+    )
+
+
+# Users who asked for /spending_habits since this worker started; together with
+# stored summaries this decides who is worth an LLM call when new purchases land
+_summary_users: Set[str] = set()
+
+
+async def _regenerate_spending_summary(user_id: str) -> None:
+    """Rebuild and store a user's spending-habit summary (background job)"""
+    store = get_transaction_store()
+    stored = await asyncio.to_thread(store.get_summary, user_id)
+    if stored is None and user_id not in _summary_users:
+        # New purchases synced by /transactions, metrics or batch loan scoring
+        # must not start an LLM call for users who never asked for a summary
+        return
+
+    with request_scope():
+        additional_customer_info = await get_sb_customer_info(user_id)
+        transactions = await get_c1_user_transactions(user_id)
+    if additional_customer_info is None or transactions is None:
+        return
+
+    # Stamp with the data version the summary is generated from
+    data_version = await asyncio.to_thread(store.data_version, user_id)
+    if stored is not None and stored["data_version"] == data_version:
+        return
+
+    batch = TransactionBatch.from_transactions(transactions)
+    summary = await complete(_spending_habits_prompt(additional_customer_info, batch))
+    await _store_summary(user_id, summary, data_version)
+    logger.info(f"Spending summary for {user_id} regenerated at {data_version}")
+
+
+summary_refresher = BackgroundRefresher(_regenerate_spending_summary)
 
 
 @router.post("/spending_habits")
@@ -27,11 +150,64 @@ async def get_spending_habits(request: Request):
     args = body.get("args", {})
     logger.debug(f"Args: {args}")
 
-    user_data = UserSpendingHabitsRequest(user_id=args.get("user_id"))
+    user_data = UserSpendingHabitsRequest(
+        user_id=args.get("user_id"),
+        stream=bool(args.get("stream", False)),
+        force_refresh=bool(args.get("force_refresh", False)),
+    )
     logger.debug(f"user id: {user_data.user_id}")
+    _summary_users.add(str(user_data.user_id))
+
+    # Serve the precomputed summary when there is one
+    store = get_transaction_store()
+    stored = None
+    if not user_data.force_refresh:
+        stored = await asyncio.to_thread(store.get_summary, user_data.user_id)
+    if stored is not None:
+        current_version = await asyncio.to_thread(
+            store.data_version, user_data.user_id
+        )
+        fresh = stored["data_version"] == current_version
+        if not fresh:
+            summary_refresher.enqueue(user_data.user_id)
+        result = {
+            "summary": stored["summary"],
+            "fallback": False,
+            "fresh": fresh,
+            "version": stored["data_version"],
+            "generated_at": stored["generated_at"],
+        }
+        if user_data.stream:
+
+            async def stored_events():
+                yield _sse({"delta": stored["summary"], "fresh": fresh})
+                yield _sse({"done": True})
 
-    customer_info = get_c1_customer(user_id=user_data.user_id)
-    additional_customer_info = get_sb_customer_info(user_data.user_id)
+            return StreamingResponse(stored_events(), media_type="text/event-stream")
+        return JSONResponse(status_code=200, content={"result": result})
+
+    gathered = await gather_with_budget(
+        {
+            "customer": (
+                get_c1_customer(user_id=user_data.user_id),
+                settings.GATHER_TIMEOUT_NESSIE_S,
+            ),
+            "customer_additional": (
+                get_sb_customer_info(user_data.user_id),
+                settings.GATHER_TIMEOUT_SUPABASE_S,
+            ),
+            "transactions": (
+                get_c1_user_transactions(user_data.user_id),
+                settings.GATHER_TIMEOUT_TRANSACTIONS_S,
+            ),
+        },
+        budget=settings.GATHER_BUDGET_S,
+    )
+    if not gathered.ok("customer", "customer_additional", "transactions"):
+        return _sources_unavailable(gathered)
+
+    customer_info = gathered["customer"]
+    additional_customer_info = gathered["customer_additional"]
     if customer_info is None or additional_customer_info is None:
         return JSONResponse(
             status_code=403,
@@ -43,7 +219,7 @@ async def get_spending_habits(request: Request):
             },
         )
 
-    transactions = get_c1_user_transactions(user_data.user_id)
+    transactions = gathered["transactions"]
 
     if transactions is None:
         return JSONResponse(
@@ -56,23 +232,99 @@ async def get_spending_habits(request: Request):
             },
         )
 
-    transaction_str = ""
-    for idx, transaction in enumerate(transactions):
-        transaction_str += f"transaction {idx}: amount: {transaction.amount}, description: {transaction.description}\n"
+    data_version = await asyncio.to_thread(store.data_version, user_data.user_id)
+    batch = TransactionBatch.from_transactions(transactions)
+    report_prompt = _spending_habits_prompt(additional_customer_info, batch)
 
-    user_info_str = f"USER - dependents: {additional_customer_info.number_of_dependents}, credit_score: {additional_customer_info.credit_score}, income: {additional_customer_info.income}, age: {additional_customer_info.age}"
-    report_prompt = f"Analyze the following transactions and user info and summarize spending habits in 2 sentences. Speak directly to the user as if you are a customer representative: \n USER {user_info_str} \n TRANSACTIONS {transaction_str} \n\n Respond as if you are speaking to the user directly, using 'you' and 'your' instead of 'the user'."
+    deadline = asyncio.get_running_loop().time() + settings.OPENAI_DEADLINE_S
 
-    response = open_ai_client.chat.completions.create(
-        model="gpt-4o-mini", messages=[{"role": "user", "content": report_prompt}]
-    )
+    if user_data.stream:
+
+        async def events():
+            parts = []
+            try:
+                async for delta in iter_until(stream_completion(report_prompt), deadline):
+                    parts.append(delta)
+                    yield _sse({"delta": delta})
+                await _store_summary(user_data.user_id, "".join(parts), data_version)
+            except Exception as e:
+                logger.warning(f"spending_habits stream fell back: {e!r}")
+                yield _sse({"fallback": _fallback_summary(batch)})
+            yield _sse({"done": True, "sources": gathered.sources})
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    try:
+        summary = await asyncio.wait_for(
+            complete(report_prompt), deadline - asyncio.get_running_loop().time()
+        )
+        fallback = False
+        await _store_summary(user_data.user_id, summary, data_version)
+    except Exception as e:
+        logger.warning(f"spending_habits fell back: {e!r}")
+        summary, fallback = _fallback_summary(batch), True
 
     return JSONResponse(
         status_code=200,
-        content={"result": {"summary": response.choices[0].message.content}},
+        content={
+            "result": {
+                "summary": summary,
+                "fallback": fallback,
+                "fresh": not fallback,
+                "version": data_version,
+                "sources": gathered.sources,
+            }
+        },
     )
 
 
+@router.post("/metrics")
+async def get_spending_metrics(request: Request):
+    """Exact spending numbers computed locally, for questions that need no LLM"""
+    logger.debug(f"/analytics/metrics request")
+
+    body = await request.json()
+    args = body.get("args", {})
+    logger.debug(f"Args: {args}")
+
+    try:
+        metrics_data = SpendingMetricsRequest(
+            **{k: v for k, v in args.items() if v is not None}
+        )
+        as_of = to_day(metrics_data.as_of) if metrics_data.as_of else None
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        return JSONResponse(
+            status_code=422,
+            content={"result": {"error": "Validation error", "message": str(e)}},
+        )
+
+    transactions = await get_c1_user_transactions(metrics_data.user_id)
+    if transactions is None:
+        return JSONResponse(
+            status_code=404,
+            content={
+                "result": {
+                    "error": "Not Found",
+                    "message": f"No accounts found for user with ID: {metrics_data.user_id}",
+                }
+            },
+        )
+
+    started = time.perf_counter()
+    metrics = compute_spending_metrics(
+        TransactionBatch.from_transactions(transactions),
+        today=as_of,
+        months=max(1, metrics_data.months),
+        top_k=metrics_data.top_k,
+        z_threshold=settings.METRICS_Z_THRESHOLD,
+    )
+    metrics["compute_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    metrics["failed_accounts"] = transactions.failed_accounts
+
+    return JSONResponse(status_code=200, content={"result": metrics})
+
+
 @router.post("/spending_plan")
 async def get_spending_plan(request: Request):
     """Generate spending habits report using GPT"""
@@ -85,8 +337,24 @@ async def get_spending_plan(request: Request):
     user_data = UserSpendingHabitsRequest(user_id=args.get("user_id"))
     logger.debug(f"user id: {user_data.user_id}")
 
-    customer_info = get_c1_customer(user_id=user_data.user_id)
-    additional_customer_info = get_sb_customer_info(user_data.user_id)
+    gathered = await gather_with_budget(
+        {
+            "customer": (
+                get_c1_customer(user_id=user_data.user_id),
+                settings.GATHER_TIMEOUT_NESSIE_S,
+            ),
+            "customer_additional": (
+                get_sb_customer_info(user_data.user_id),
+                settings.GATHER_TIMEOUT_SUPABASE_S,
+            ),
+        },
+        budget=settings.GATHER_BUDGET_S,
+    )
+    if not gathered.ok("customer", "customer_additional"):
+        return _sources_unavailable(gathered)
+
+    customer_info = gathered["customer"]
+    additional_customer_info = gathered["customer_additional"]
     if customer_info is None or additional_customer_info is None:
         return JSONResponse(
             status_code=403,
@@ -98,18 +366,22 @@ async def get_spending_plan(request: Request):
             },
         )
 
-    user_info_str = f"USER - dependents: {additional_customer_info.number_of_dependents}, credit_score: {additional_customer_info.credit_score}, income: {additional_customer_info.income}, age: {additional_customer_info.age}"
+    profile = _plan_profile(additional_customer_info)
+    cache_key = "plan:v1:" + ":".join(f"{k}={v}" for k, v in profile.items())
+    plan_data = await asyncio.to_thread(plan_cache.get, cache_key)
+    if plan_data is not MISSING:
+        return JSONResponse(
+            content={"plan": plan_data, "cached": True, "sources": gathered.sources}
+        )
+
+    user_info_str = f"USER - dependents: {profile['dependents']}, credit_score: {profile['credit_score']}, income: {profile['income']}, age: {profile['age']}"
     plan_prompt = f"""Based on the user info and standard good spending habits, generate a 
     spending amount for each category per month and a summary. Your response must be a JSON 
     object with keys: spending_plan_summary, housing_amount, food_amount, shopping_amount, entertainment_amount, saving_amount.\n
     USER {user_info_str}"""
 
-    response = open_ai_client.chat.completions.create(
-        model="gpt-4o-mini", messages=[{"role": "user", "content": plan_prompt}]
-    )
-
     try:
-        plan_json = response.choices[0].message.content
+        plan_json = await complete(plan_prompt)
         plan_data = json.loads(plan_json)  # Ensure it's valid JSON
     except (KeyError, json.JSONDecodeError) as e:
         logger.error(f"Invalid response from OpenAI: {e}")
@@ -118,4 +390,9 @@ async def get_spending_plan(request: Request):
             content={"error": "Invalid response format from AI"},
         )
 
-    return JSONResponse(content={"plan": plan_data})
+    if isinstance(plan_data, dict):
+        await asyncio.to_thread(plan_cache.set, cache_key, plan_data)
+
+    return JSONResponse(
+        content={"plan": plan_data, "cached": False, "sources": gathered.sources}
+    )
@@ -1,13 +1,19 @@
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from datetime import datetime, timedelta
-from typing import Optional
-import joblib
-import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, List, Optional, Tuple
+import asyncio
+import json
 import os
-from ..config import logger
+from ..config import logger, settings
+from ..gather import gather_with_budget
+from ..lazy import lazy_import
+from ..model_registry import ModelRegistry
+from ..request_context import request_scope
+from ..transaction_batch import TransactionBatch
 from ..database import (
-    supabase,
+    get_supabase,
     get_c1_user_loans,
     get_sb_customer_info,
     get_c1_user_transactions,
@@ -15,23 +21,15 @@ from ..database import (
     get_c1_customer,
 )
 
-router = APIRouter()
+np = lazy_import("numpy")
 
-# Initialize loan_model as None
-loan_model = None
-model_path = os.path.join(os.getcwd(), "ml/loan_model.pkl")
+router = APIRouter()
 
-try:
-    if os.path.exists(model_path):
-        loan_model = joblib.load(model_path)
-        logger.info("Loan model loaded successfully.")
-    else:
-        logger.warning(
-            f"loan_model.pkl not found at {model_path}. Loan approval functionality will be limited."
-        )
-except Exception as e:
-    logger.error(f"Error loading loan model: {str(e)}")
-    loan_model = None
+# Loaded in the background by the app lifespan; see ModelRegistry
+loan_model_registry = ModelRegistry(
+    os.path.join(os.getcwd(), settings.LOAN_MODEL_PATH),
+    reload_interval=settings.LOAN_MODEL_RELOAD_INTERVAL,
+)
 
 
 class LoanApplicationModel(BaseModel):
@@ -50,6 +48,7 @@ class LoanApplicationResponse(BaseModel):
     approved_amount: float
     deposited_to: int
     message: str
+    model_version: Optional[str] = None
 
 
 class LoadApplicationRequest(BaseModel):
@@ -57,6 +56,123 @@ class LoadApplicationRequest(BaseModel):
     account_number: int
 
 
+class LoanScoreBatchRequest(BaseModel):
+    user_ids: List[int]
+    chunk_size: Optional[int] = None
+    concurrency: Optional[int] = None
+
+
+# Column order expected by the Random Forest model
+LOAN_FEATURES = (
+    "total_debt",
+    "avg_monthly_spending",
+    "total_balance",
+    "income",
+    "age",
+    "credit_score",
+    "dependents",
+)
+
+_predict_pool: Optional[ThreadPoolExecutor] = None
+
+
+def loan_features(applications: List[LoanApplicationModel]) -> "np.ndarray":
+    """Stack applications into an (N, 7) feature matrix"""
+    return np.array(
+        [[getattr(app, name) for name in LOAN_FEATURES] for app in applications],
+        dtype=np.float64,
+    ).reshape(len(applications), len(LOAN_FEATURES))
+
+
+def _predict_amounts(features: "np.ndarray") -> Tuple[List[float], str]:
+    predictions, version = loan_model_registry.predict(features)
+    return [max(0, round(float(amount), 2)) for amount in predictions], version
+
+
+async def score_loan_applications(
+    user_ids: List[int],
+    chunk_size: Optional[int] = None,
+    concurrency: Optional[int] = None,
+) -> AsyncIterator[dict]:
+    """Score many users, yielding one result per user in input order.
+
+    Features for each chunk are gathered concurrently (bounded by
+    concurrency) and the chunk is scored with a single predict call on
+    the prediction thread pool.
+    """
+    global _predict_pool
+    if _predict_pool is None:
+        _predict_pool = ThreadPoolExecutor(
+            max_workers=settings.LOAN_SCORE_PREDICT_WORKERS,
+            thread_name_prefix="loan-predict",
+        )
+
+    chunk_size = max(1, chunk_size or settings.LOAN_SCORE_CHUNK_SIZE)
+    semaphore = asyncio.Semaphore(concurrency or settings.LOAN_SCORE_CONCURRENCY)
+    loop = asyncio.get_running_loop()
+
+    async def gather_one(user_id: int) -> Optional[LoanApplicationModel]:
+        async with semaphore:
+            # Fresh memo per user so a long run does not pin every result
+            with request_scope():
+                return await calculate_user_loan_info(user_id)
+
+    for start in range(0, len(user_ids), chunk_size):
+        chunk = user_ids[start : start + chunk_size]
+        applications = await asyncio.gather(
+            *(gather_one(user_id) for user_id in chunk), return_exceptions=True
+        )
+
+        ready = [app for app in applications if isinstance(app, LoanApplicationModel)]
+        amounts, version = (
+            await loop.run_in_executor(
+                _predict_pool, _predict_amounts, loan_features(ready)
+            )
+            if ready
+            else ([], None)
+        )
+        amounts = iter(amounts)
+
+        for user_id, app in zip(chunk, applications):
+            if isinstance(app, LoanApplicationModel):
+                yield {
+                    "user_id": user_id,
+                    "approved_amount": next(amounts),
+                    "model_version": version,
+                }
+            elif isinstance(app, Exception):
+                logger.error(f"Loan scoring failed for user {user_id}: {app!r}")
+                yield {"user_id": user_id, "error": str(app) or type(app).__name__}
+            else:
+                yield {"user_id": user_id, "error": "User not found"}
+
+
+@router.get("/model_status")
+async def get_model_status():
+    """Readiness and version of the currently served loan model"""
+    return loan_model_registry.status()
+
+
+@router.post("/score_batch")
+async def score_batch(request: Request):
+    """Pre-qualify many users at once, streaming NDJSON results as chunks finish"""
+    body = await request.json()
+    args = body.get("args", {})
+    batch = LoanScoreBatchRequest(**args)
+    logger.debug(f"/loans/score_batch request for {len(batch.user_ids)} users")
+
+    if not loan_model_registry.ready:
+        raise HTTPException(status_code=503, detail="Loan model is not available")
+
+    async def stream():
+        async for result in score_loan_applications(
+            batch.user_ids, chunk_size=batch.chunk_size, concurrency=batch.concurrency
+        ):
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 @router.post(
     "/submit_loan_application",
     response_model=LoanApplicationResponse,
@@ -79,7 +195,7 @@ async def submit_loan_application(request: Request):
     account_number = loan_data.account_number
 
     # 1. Get user financial info for loan processing
-    user_loan_data = calculate_user_loan_info(user_id)
+    user_loan_data = await calculate_user_loan_info(user_id)
     if not user_loan_data:
         raise HTTPException(
             status_code=404,
@@ -87,21 +203,13 @@ async def submit_loan_application(request: Request):
         )
 
     # 2. Prepare features for the Random Forest model
-    features = np.array(
-        [
-            user_loan_data.total_debt,
-            user_loan_data.avg_monthly_spending,
-            user_loan_data.total_balance,
-            user_loan_data.income,
-            user_loan_data.age,
-            user_loan_data.credit_score,
-            user_loan_data.dependents,
-        ]
-    ).reshape(1, -1)
+    features = loan_features([user_loan_data])
 
     # 3. Predict loan eligibility amount
-    approved_loan_amount = loan_model.predict(features)[0]  # Extract single prediction
-    approved_loan_amount = max(0, round(approved_loan_amount, 2))
+    if not loan_model_registry.ready:
+        raise HTTPException(status_code=503, detail="Loan model is not available")
+    amounts, model_version = _predict_amounts(features)
+    approved_loan_amount = amounts[0]  # Extract single prediction
 
     if approved_loan_amount == 0:
         raise HTTPException(
@@ -110,6 +218,7 @@ async def submit_loan_application(request: Request):
         )
 
     # 4. Add the approved loan to the database
+    supabase = get_supabase()
     loan_response = (
         supabase.table("loans")
         .insert(
@@ -145,51 +254,56 @@ async def submit_loan_application(request: Request):
         approved_amount=approved_loan_amount,
         deposited_to=account_number,
         message=f"Loan approved for ${approved_loan_amount} and deposited into account {account_number}.",
+        model_version=model_version,
     )
 
 
-def calculate_user_loan_info(user_id: int) -> Optional[LoanApplicationModel]:
+async def calculate_user_loan_info(user_id: int) -> Optional[LoanApplicationModel]:
     """Calculate loan-related metrics for a user"""
 
-    # 1. Get all user loans and sum total debt
-    user_loans = get_c1_user_loans(user_id)
+    gathered = await gather_with_budget(
+        {
+            "loans": (get_c1_user_loans(user_id), settings.GATHER_TIMEOUT_NESSIE_S),
+            "transactions": (
+                get_c1_user_transactions(user_id),
+                settings.GATHER_TIMEOUT_TRANSACTIONS_S,
+            ),
+            "accounts": (get_c1_accounts(user_id), settings.GATHER_TIMEOUT_NESSIE_S),
+            "customer": (get_c1_customer(user_id), settings.GATHER_TIMEOUT_NESSIE_S),
+            "customer_additional": (
+                get_sb_customer_info(user_id),
+                settings.GATHER_TIMEOUT_SUPABASE_S,
+            ),
+        },
+        budget=settings.GATHER_BUDGET_S,
+    )
+    logger.debug(f"calculate_user_loan_info({user_id}) sources={gathered.sources}")
+
+    # 1. Get user personal details (required)
+    user_info = gathered["customer"]
+    additional_user_info = gathered["customer_additional"]
+    if not user_info or not additional_user_info:
+        return None  # User not found or unreachable within budget
+
+    # 2. Sum total debt across all loans
+    user_loans = gathered["loans"]
     total_debt = sum(loan.amount for loan in user_loans) if user_loans else 0.0
 
-    # 2. Get all transactions and compute average monthly spending
-    user_transactions = get_c1_user_transactions(user_id)
+    # 3. Compute average monthly spending
+    user_transactions = gathered["transactions"]
     if user_transactions:
-        now = datetime.now()
-        one_year_ago = now - timedelta(days=365)
-
-        # Filter transactions from the last 12 months
-        last_year_transactions = [
-            txn
-            for txn in user_transactions
-            if datetime.strptime(txn.purchase_date, "%Y-%m-%d").date() >= one_year_ago
-        ]
-
-        if last_year_transactions:
-            total_spent = sum(
-                abs(txn.amount) for txn in last_year_transactions if txn.amount < 0
-            )  # Only expenses
-            avg_monthly_spending = total_spent / 12
-        else:
-            avg_monthly_spending = 0.0
+        # Only expenses from the last 12 months
+        last_year = TransactionBatch.from_transactions(user_transactions).last_days(365)
+        avg_monthly_spending = last_year.expense_total() / 12
     else:
         avg_monthly_spending = 0.0
 
-    # 3. Get all accounts and calculate total balance
-    user_accounts = get_c1_accounts(user_id)
+    # 4. Calculate total balance across accounts
+    user_accounts = gathered["accounts"]
     total_balance = (
         sum(account.balance for account in user_accounts) if user_accounts else 0.0
     )
 
-    # 4. Get user personal details
-    user_info = get_c1_customer(user_id)
-    additional_user_info = get_sb_customer_info(user_id)
-    if not user_info or not additional_user_info:
-        return None  # User not found
-
     # 5. Create LoanModel object
     return LoanApplicationModel(
         user_id=user_id,
@@ -0,0 +1,31 @@
+from fastapi import APIRouter
+from ..database import nessie_cache
+from ..llm import llm_stats
+from .analytics import plan_cache, summary_refresher
+from ..startup import startup_timings
+
+router = APIRouter()
+
+
+@router.get("/cache")
+async def get_cache_stats():
+    """Hit/miss/eviction counters for the Nessie read-through cache"""
+    return {"nessie": nessie_cache.stats(), "spending_plan": plan_cache.stats()}
+
+
+@router.get("/summaries")
+async def get_summary_refresh_stats():
+    """Background spending-summary regeneration queue"""
+    return summary_refresher.stats()
+
+
+@router.get("/llm")
+async def get_llm_stats():
+    """OpenAI concurrency limiter queue depth, wait times and coalesced calls"""
+    return llm_stats()
+
+
+@router.get("/startup")
+async def get_startup_timings():
+    """Import and startup phase timings (ms) for this worker"""
+    return startup_timings()
@@ -2,12 +2,13 @@ from fastapi import APIRouter, Request, HTTPException
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
 from ..database import (
-    supabase,
     get_c1_account_info,
     create_c1_transfer_account,
     get_c1_user_transactions,
 )
-from ..config import logger
+from ..config import logger, settings
+from ..gather import gather_with_budget
+from ..responses import FastJSONResponse
 
 router = APIRouter()
 
@@ -27,9 +28,15 @@ class TransferRequest(BaseModel):
 @router.get("/transactions/{user_id}")
 async def get_transactions(user_id: str):
     try:
-        transactions = get_c1_user_transactions(user_id)
+        transactions = await get_c1_user_transactions(user_id)
         if transactions:
-            return {"user_id": user_id, "transactions": transactions}
+            return FastJSONResponse(
+                {
+                    "user_id": user_id,
+                    "transactions": transactions,
+                    "failed_accounts": transactions.failed_accounts,
+                }
+            )
 
     except ValueError as e:
         return JSONResponse(
@@ -51,7 +58,7 @@ async def get_balance(request: Request):
         account_id = args.get("account_id")
 
         data = BalanceRequest(account_id=account_id)
-        result = get_c1_account_info(data.account_id)
+        result = await get_c1_account_info(data.account_id)
 
         return JSONResponse(
             status_code=200,
@@ -81,8 +88,33 @@ async def transfer_funds(request: Request):
             amount=float(args.get("amount")),
         )
 
-        from_account = get_c1_account_info(data.from_account)
-        to_account = get_c1_account_info(data.to_account)
+        gathered = await gather_with_budget(
+            {
+                "from_account": (
+                    get_c1_account_info(data.from_account),
+                    settings.GATHER_TIMEOUT_NESSIE_S,
+                ),
+                "to_account": (
+                    get_c1_account_info(data.to_account),
+                    settings.GATHER_TIMEOUT_NESSIE_S,
+                ),
+            },
+            budget=settings.GATHER_BUDGET_S,
+        )
+        if not gathered.ok("from_account", "to_account"):
+            return JSONResponse(
+                status_code=504,
+                content={
+                    "result": {
+                        "error": "Upstream Timeout",
+                        "message": "Could not verify both accounts in time",
+                        "sources": gathered.sources,
+                    }
+                },
+            )
+
+        from_account = gathered["from_account"]
+        to_account = gathered["to_account"]
 
         if not from_account or not to_account:
             return JSONResponse(
@@ -106,7 +138,7 @@ async def transfer_funds(request: Request):
                 },
             )
 
-        create_c1_transfer_account(
+        await create_c1_transfer_account(
             from_account.id,
             medium="balance",
             payee_id=to_account.id,
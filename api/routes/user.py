@@ -2,7 +2,7 @@ from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from ..database import (
-    supabase,
+    get_supabase,
     get_c1_accounts,
     get_c1_account_loans,
     get_c1_user_transactions,
@@ -10,6 +10,7 @@ from ..database import (
 )
 from ..config import logger
 from ..models import AccountInfo
+from ..responses import FastJSONResponse
 
 router = APIRouter()
 
@@ -35,7 +36,8 @@ async def get_balance(request: Request):
         data = UserAuthRequest(account_id=account_id, pin=pin)
 
         response = (
-            supabase.table("account_pins")
+            get_supabase()
+            .table("account_pins")
             .select("pin")
             .eq("account_id", data.account_id)
             .single()
@@ -62,10 +64,10 @@ async def get_balance(request: Request):
 @router.get("/account/{account_id}", response_model=AccountInfo)
 async def get_account_info(account_id: str):
     """Fetch user account details for a specific account"""
-    account_info = get_c1_account_info(account_id=account_id)
+    account_info = await get_c1_account_info(account_id=account_id)
 
     if account_info:
-        return account_info
+        return FastJSONResponse(account_info)
 
     raise HTTPException(status_code=404, detail="Account not found")
 
@@ -73,10 +75,10 @@ async def get_account_info(account_id: str):
 @router.get("/accounts/{user_id}", response_model=dict)
 async def get_user_accounts(user_id: str):
     """Fetch all accounts associated with a user"""
-    accounts = get_c1_accounts(user_id=user_id)
+    accounts = await get_c1_accounts(user_id=user_id)
 
     if accounts:
-        return {"user_id": user_id, "accounts": accounts}
+        return FastJSONResponse({"user_id": user_id, "accounts": accounts})
 
     raise HTTPException(status_code=404, detail="No accounts found for this user")
 
@@ -84,13 +86,15 @@ async def get_user_accounts(user_id: str):
 @router.get("/loans/{account_id}", response_model=dict)
 async def get_account_loans(account_id: str):
     """Fetch all loans for a specific account"""
-    loans = get_c1_account_loans(account_id=account_id)
+    loans = await get_c1_account_loans(account_id=account_id)
     if loans:
         # Convert to LoanInfo models
-        return {
-            "account_id": account_id,
-            "loans": loans,
-        }
+        return FastJSONResponse(
+            {
+                "account_id": account_id,
+                "loans": loans,
+            }
+        )
 
     raise HTTPException(status_code=404, detail="No loans found for this account")
 
@@ -98,12 +102,15 @@ async def get_account_loans(account_id: str):
 @router.get("/transactions/{user_id}", response_model=dict)
 async def get_transaction_history(user_id: int):
     """Fetch transaction history for a specific account"""
-    transactions = get_c1_user_transactions(user_id)
+    transactions = await get_c1_user_transactions(user_id)
     if transactions:
-        return {
-            "user_id": user_id,
-            "transactions": transactions,
-        }
+        return FastJSONResponse(
+            {
+                "user_id": user_id,
+                "transactions": transactions,
+                "failed_accounts": transactions.failed_accounts,
+            }
+        )
 
     raise HTTPException(
         status_code=404, detail="No transactions found for this account"
@@ -0,0 +1,91 @@
+from datetime import date
+from typing import Any, Dict, Optional
+from .lazy import lazy_import
+from .transaction_batch import DateLike, TransactionBatch, to_day
+
+np = lazy_import("numpy")
+
+
+def _pct_change(current: float, previous: float) -> Optional[float]:
+    return round((current - previous) / abs(previous) * 100, 2) if previous else None
+
+
+def compute_spending_metrics(
+    batch: TransactionBatch,
+    today: Optional[DateLike] = None,
+    months: int = 12,
+    top_k: int = 5,
+    z_threshold: float = 3.0,
+) -> Dict[str, Any]:
+    """Exact spending figures for a user, computed locally without an LLM.
+
+    Covers the `months` calendar months up to and including today's month:
+    spend per month (zero-filled) with a 3-month rolling average, the
+    month-over-month change, totals by type and top merchants, and purchases
+    or months whose amount is more than z_threshold standard deviations
+    from the user's mean.
+    """
+    today = to_day(today if today is not None else date.today())
+    end_month = today.astype("datetime64[M]")
+    start_month = end_month - (months - 1)
+    window = batch.window(start_month.astype("datetime64[D]"), today + 1)
+
+    # Zero-filled monthly series over the window
+    month_axis = np.arange(start_month, end_month + 1, dtype="datetime64[M]")
+    spent, totals = window.monthly_totals()
+    monthly = np.zeros(len(month_axis))
+    monthly[np.searchsorted(month_axis, spent)] = totals
+    csum = np.cumsum(monthly)
+    trailing = csum - np.concatenate([np.zeros(3), csum[:-3]])[: len(csum)]
+    rolling = trailing / np.minimum(np.arange(1, len(monthly) + 1), 3)
+
+    current = monthly[-1]
+    previous = monthly[-2] if len(monthly) > 1 else 0.0
+
+    types, type_totals = window.group_totals("types")
+
+    # z-scores of individual purchases and of monthly spend
+    anomalies = []
+    if len(window) > 1 and window.amounts.std() > 0:
+        z = (window.amounts - window.amounts.mean()) / window.amounts.std()
+        flagged = np.flatnonzero(np.abs(z) > z_threshold)
+        for i in flagged[np.argsort(-np.abs(z[flagged]))][:top_k]:
+            anomalies.append(
+                {
+                    "date": str(window.dates[i]),
+                    "amount": float(window.amounts[i]),
+                    "merchant_id": str(window.merchant_ids[i]),
+                    "description": str(window.descriptions[i]),
+                    "z_score": round(float(z[i]), 2),
+                }
+            )
+    month_anomalies = []
+    if len(monthly) > 1 and monthly.std() > 0:
+        month_z = (monthly - monthly.mean()) / monthly.std()
+        month_anomalies = [
+            {"month": str(m), "total": float(t), "z_score": round(float(mz), 2)}
+            for m, t, mz in zip(month_axis, monthly, month_z)
+            if abs(mz) > z_threshold
+        ]
+
+    return {
+        "window": {"start": str(start_month), "end": str(end_month)},
+        "purchase_count": len(window),
+        "total_spent": round(window.total(), 2),
+        "monthly_spend": [
+            {"month": str(m), "total": round(float(t), 2), "rolling_3m": round(float(r), 2)}
+            for m, t, r in zip(month_axis, monthly, rolling)
+        ],
+        "month_over_month": {
+            "current_month": round(float(current), 2),
+            "previous_month": round(float(previous), 2),
+            "delta": round(float(current - previous), 2),
+            "pct_change": _pct_change(float(current), float(previous)),
+        },
+        "by_type": {str(k): round(float(v), 2) for k, v in zip(types, type_totals)},
+        "top_merchants": [
+            {"merchant_id": m, "total": round(t, 2)} for m, t in window.top_merchants(top_k)
+        ],
+        "anomalies": anomalies,
+        "anomalous_months": month_anomalies,
+    }
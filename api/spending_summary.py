@@ -0,0 +1,115 @@
+import math
+from typing import List
+from .config import settings
+from .transaction_batch import TransactionBatch
+
+# Rough OpenAI tokenizer ratio for English text and numbers
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _clip(text: str, width: int = 40) -> str:
+    text = " ".join(str(text).split())
+    return text if len(text) <= width else text[: width - 1] + "…"
+
+
+def summarize_spending(
+    batch: TransactionBatch,
+    token_budget: int = None,
+    top_k: int = None,
+    trend_months: int = 6,
+) -> str:
+    """Compress a purchase history into a prompt section of bounded size.
+
+    Sections are emitted in priority order (overview, monthly trend, types,
+    merchants, largest purchases, recurring charges) and every line has a
+    bounded width, so the result stays within token_budget no matter how
+    long the history is.
+    """
+    token_budget = token_budget or settings.SPENDING_SUMMARY_TOKEN_BUDGET
+    top_k = top_k or settings.SPENDING_SUMMARY_TOP_K
+
+    lines: List[str] = []
+    used = 0
+
+    def add(line: str) -> bool:
+        nonlocal used
+        cost = estimate_tokens(line) + 1
+        if used + cost > token_budget:
+            return False
+        lines.append(line)
+        used += cost
+        return True
+
+    if not len(batch):
+        add("No purchases on record.")
+        return "\n".join(lines)
+
+    dated = batch.window()
+    months, monthly_totals = dated.monthly_totals()
+    overview = f"{len(batch)} purchases, total {batch.total():.2f}"
+    if len(months):
+        overview += (
+            f", {months[0]} to {months[-1]}"
+            f", average {monthly_totals.mean():.2f} per active month"
+        )
+    add(overview)
+
+    sections = []
+    if len(months):
+        sections.append(
+            (
+                "Monthly totals (recent):",
+                [
+                    f"- {month}: {total:.2f}"
+                    for month, total in zip(
+                        months[-trend_months:], monthly_totals[-trend_months:]
+                    )
+                ],
+            )
+        )
+
+    types, type_totals = batch.group_totals("types")
+    order = type_totals.argsort()[::-1][:top_k]
+    sections.append(
+        ("By type:", [f"- {_clip(types[i])}: {type_totals[i]:.2f}" for i in order])
+    )
+    sections.append(
+        (
+            "Top merchants:",
+            [f"- {_clip(m)}: {t:.2f}" for m, t in batch.top_merchants(top_k)],
+        )
+    )
+    largest = batch.largest(top_k)
+    sections.append(
+        (
+            "Largest purchases:",
+            [
+                f"- {amount:.2f} on {day}: {_clip(description) or 'no description'}"
+                for amount, day, description in zip(
+                    largest.amounts, largest.dates, largest.descriptions
+                )
+            ],
+        )
+    )
+    sections.append(
+        (
+            "Recurring charges:",
+            [
+                f"- {_clip(merchant)}: {amount:.2f} in {n} months"
+                for merchant, amount, n in batch.recurring(limit=top_k)
+            ],
+        )
+    )
+
+    for title, items in sections:
+        if not items or not add(title):
+            continue
+        for item in items:
+            if not add(item):
+                break
+
+    return "\n".join(lines)
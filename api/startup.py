@@ -0,0 +1,32 @@
+import importlib
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator
+
+_timings: Dict[str, float] = {}
+
+
+def record(phase: str, started_at: float) -> None:
+    """Record the milliseconds elapsed since a time.perf_counter() start"""
+    _timings[phase] = round((time.perf_counter() - started_at) * 1000, 2)
+
+
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(phase, started_at)
+
+
+def startup_timings() -> Dict[str, float]:
+    return dict(_timings)
+
+
+def warm_imports(modules: Iterable[str] = ("numpy", "openai", "supabase")) -> None:
+    """Import heavy dependencies ahead of the first request that needs them"""
+    for name in modules:
+        with timed(f"warm:{name}"):
+            # import_module is safe against requests importing the same module
+            importlib.import_module(name)
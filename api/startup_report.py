@@ -0,0 +1,76 @@
+"""Cold-start breakdown for the API.
+
+Usage: python -m api.startup_report [--budget-ms MS] [--top N]
+
+Imports api.app in a fresh interpreter with -X importtime, then runs the
+app lifespan once, and prints where the time went. Exits non-zero when
+import plus startup exceeds the budget (STARTUP_BUDGET_MS by default).
+"""
+
+import argparse
+import asyncio
+import subprocess
+import sys
+from typing import List, Tuple
+
+
+def import_breakdown(module: str = "api.app") -> List[Tuple[str, int, int]]:
+    """(module, self us, cumulative us) for every import made by `module`"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+async def lifespan_breakdown() -> dict:
+    from api.app import app
+    from api.startup import startup_timings
+
+    async with app.router.lifespan_context(app):
+        pass
+    return startup_timings()
+
+
+def main() -> int:
+    from api.config import settings
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=settings.STARTUP_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    rows = import_breakdown()
+    total_import_ms = next(cum for name, _, cum in rows if name == "api.app") / 1000
+
+    print(f"Top {args.top} imports by self time:")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda r: -r[1])[: args.top]:
+        print(f"  {self_us / 1000:9.1f} ms  (cum {cumulative_us / 1000:9.1f} ms)  {name}")
+
+    timings = asyncio.run(lifespan_breakdown())
+    startup_ms = timings.get("lifespan:startup", 0.0)
+    print("\nStartup phases:")
+    for phase, ms in timings.items():
+        print(f"  {ms:9.1f} ms  {phase}")
+
+    total_ms = total_import_ms + startup_ms
+    status = "OK" if total_ms <= args.budget_ms else "OVER BUDGET"
+    print(
+        f"\nimport api.app {total_import_ms:.1f} ms + startup {startup_ms:.1f} ms "
+        f"= {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms) {status}"
+    )
+    return 0 if total_ms <= args.budget_ms else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+from .lazy import lazy_import
+from .models import TransactionInfo
+
+np = lazy_import("numpy")
+
+DateLike = Union[str, date, "np.datetime64"]
+
+
+def to_day(value: DateLike) -> np.datetime64:
+    return np.datetime64(value, "D")
+
+
+class TransactionBatch:
+    """Columnar (NumPy) view of a set of purchases for vectorized spending math.
+
+    Columns are aligned arrays: dates (datetime64[D], NaT when missing),
+    amounts (float64), merchant_ids, statuses, types and descriptions.
+    Filtering methods return a new batch over the selected rows.
+
+    Amounts follow Nessie's purchase convention: a purchase is money spent,
+    so it is positive; a negative amount (refund, reversal) offsets spend.
+    """
+
+    __slots__ = ("dates", "amounts", "merchant_ids", "statuses", "types", "descriptions")
+
+    def __init__(
+        self,
+        dates: np.ndarray,
+        amounts: np.ndarray,
+        merchant_ids: np.ndarray,
+        statuses: np.ndarray,
+        types: np.ndarray,
+        descriptions: np.ndarray,
+    ):
+        self.dates = dates
+        self.amounts = amounts
+        self.merchant_ids = merchant_ids
+        self.statuses = statuses
+        self.types = types
+        self.descriptions = descriptions
+
+    @classmethod
+    def from_transactions(
+        cls, transactions: Iterable[TransactionInfo]
+    ) -> "TransactionBatch":
+        transactions = list(transactions)
+        return cls(
+            dates=np.array(
+                [t.purchase_date or "NaT" for t in transactions], dtype="datetime64[D]"
+            ),
+            amounts=np.array([t.amount for t in transactions], dtype=np.float64),
+            merchant_ids=np.array([t.merchant_id for t in transactions], dtype=object),
+            statuses=np.array([t.status for t in transactions], dtype=object),
+            types=np.array([t.type for t in transactions], dtype=object),
+            descriptions=np.array(
+                [t.description or "" for t in transactions], dtype=object
+            ),
+        )
+
+    def __len__(self) -> int:
+        return len(self.amounts)
+
+    def filter(self, mask: np.ndarray) -> "TransactionBatch":
+        return TransactionBatch(
+            *(getattr(self, column)[mask] for column in self.__slots__)
+        )
+
+    def window(
+        self, start: Optional[DateLike] = None, end: Optional[DateLike] = None
+    ) -> "TransactionBatch":
+        """Rows with start <= date < end; rows without a date are dropped"""
+        mask = ~np.isnat(self.dates)
+        if start is not None:
+            mask &= self.dates >= to_day(start)
+        if end is not None:
+            mask &= self.dates < to_day(end)
+        return self.filter(mask)
+
+    def last_days(self, days: int, today: Optional[DateLike] = None) -> "TransactionBatch":
+        end = to_day(today if today is not None else date.today()) + 1
+        return self.window(end - days, end)
+
+    def with_status(self, *statuses: str) -> "TransactionBatch":
+        return self.filter(np.isin(self.statuses, statuses))
+
+    def total(self) -> float:
+        return float(self.amounts.sum())
+
+    def expense_total(self) -> float:
+        """Net amount spent (purchases less refunds), never below 0.0"""
+        spent = self.total()
+        return spent if spent > 0 else 0.0
+
+    def monthly_totals(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(months as datetime64[M], summed amount) sorted by month"""
+        dated = self.window()
+        months = dated.dates.astype("datetime64[M]")
+        unique_months, inverse = np.unique(months, return_inverse=True)
+        return unique_months, np.bincount(
+            inverse, weights=dated.amounts, minlength=len(unique_months)
+        )
+
+    def group_totals(self, column: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(distinct values of column, summed amount per value)"""
+        keys, inverse = np.unique(getattr(self, column).astype(str), return_inverse=True)
+        return keys, np.bincount(inverse, weights=self.amounts, minlength=len(keys))
+
+    def merchant_totals(self) -> Dict[str, float]:
+        merchants, totals = self.group_totals("merchant_ids")
+        return {str(m): float(t) for m, t in zip(merchants, totals)}
+
+    def top_merchants(self, k: int) -> List[Tuple[str, float]]:
+        merchants, totals = self.group_totals("merchant_ids")
+        order = np.argsort(-totals, kind="stable")[:k]
+        return [(str(merchants[i]), float(totals[i])) for i in order]
+
+    def largest(self, k: int) -> "TransactionBatch":
+        """The k rows with the largest absolute amount, largest first"""
+        return self.filter(np.argsort(-np.abs(self.amounts), kind="stable")[:k])
+
+    def recurring(
+        self, min_months: int = 3, limit: Optional[int] = None
+    ) -> List[Tuple[str, float, int]]:
+        """(merchant, amount, months seen) for charges repeating across months.
+
+        A charge is the same merchant billing the same whole-dollar amount;
+        it counts as recurring once it appears in min_months distinct months.
+        """
+        dated = self.window()
+        if not len(dated):
+            return []
+        merchants, merchant_idx = np.unique(
+            dated.merchant_ids.astype(str), return_inverse=True
+        )
+        amounts, amount_idx = np.unique(np.round(dated.amounts), return_inverse=True)
+        charge = merchant_idx.astype(np.int64) * len(amounts) + amount_idx
+        months = dated.dates.astype("datetime64[M]").astype(np.int64)
+        months -= months.min()
+        span = int(months.max()) + 1
+
+        # Distinct (charge, month) pairs, then how many months each charge spans
+        pairs = np.unique(charge * span + months)
+        charges, month_counts = np.unique(pairs // span, return_counts=True)
+        keep = month_counts >= min_months
+        order = np.argsort(-month_counts[keep], kind="stable")[:limit]
+        return [
+            (
+                str(merchants[c // len(amounts)]),
+                float(amounts[c % len(amounts)]),
+                int(n),
+            )
+            for c, n in zip(charges[keep][order], month_counts[keep][order])
+        ]
@@ -0,0 +1,226 @@
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+from .config import settings
+
+PURCHASE_COLUMNS = (
+    "type",
+    "merchant_id",
+    "payer_id",
+    "purchase_date",
+    "amount",
+    "status",
+    "medium",
+    "description",
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS purchases (
+    id TEXT PRIMARY KEY,
+    account_id TEXT NOT NULL,
+    customer_id TEXT NOT NULL,
+    type TEXT,
+    merchant_id TEXT,
+    payer_id TEXT,
+    purchase_date TEXT,
+    amount INTEGER,
+    status TEXT,
+    medium TEXT,
+    description TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_purchases_customer_date
+    ON purchases (customer_id, purchase_date);
+CREATE INDEX IF NOT EXISTS idx_purchases_account_date
+    ON purchases (account_id, purchase_date);
+CREATE TABLE IF NOT EXISTS spending_summaries (
+    customer_id TEXT PRIMARY KEY,
+    summary TEXT NOT NULL,
+    data_version TEXT NOT NULL,
+    generated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS customer_versions (
+    customer_id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    account_id TEXT PRIMARY KEY,
+    customer_id TEXT NOT NULL,
+    synced_at REAL NOT NULL
+);
+"""
+
+
+class TransactionStore:
+    """Local SQLite copy of Nessie purchases, synced per account.
+
+    Nessie's purchases endpoint has no "since" filter, so each sync downloads
+    an account's whole list and mirrors it: new rows are inserted, changed
+    rows (e.g. a status change) updated and rows Nessie no longer returns
+    deleted. Reads are then served from the local indexes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def synced_at(self, account_ids: Iterable[str]) -> Dict[str, float]:
+        ids = list(account_ids)
+        if not ids:
+            return {}
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT account_id, synced_at FROM sync_state "
+                f"WHERE account_id IN ({','.join('?' * len(ids))})",
+                ids,
+            ).fetchall()
+        return {row["account_id"]: row["synced_at"] for row in rows}
+
+    def stale_accounts(self, max_age: float) -> List[Dict[str, str]]:
+        """Accounts whose last sync is older than max_age seconds"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT account_id, customer_id FROM sync_state WHERE synced_at < ?",
+                (time.time() - max_age,),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def apply_sync(
+        self, account_id: str, customer_id: str, purchases: List[Dict[str, Any]]
+    ) -> int:
+        """Make the account's stored purchases match Nessie's list.
+
+        Returns how many rows were inserted, changed or deleted.
+        """
+        columns = ", ".join(PURCHASE_COLUMNS)
+        changed = " OR ".join(
+            f"purchases.{column} IS NOT excluded.{column}" for column in PURCHASE_COLUMNS
+        )
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                f"INSERT INTO purchases (id, account_id, customer_id, {columns}) "
+                f"VALUES (?, ?, ?, {', '.join('?' * len(PURCHASE_COLUMNS))}) "
+                "ON CONFLICT (id) DO UPDATE SET "
+                + ", ".join(f"{column} = excluded.{column}" for column in PURCHASE_COLUMNS)
+                + f" WHERE {changed}",
+                [
+                    (p["_id"], account_id, customer_id)
+                    + tuple(p.get(column) for column in PURCHASE_COLUMNS)
+                    for p in purchases
+                ],
+            )
+
+            current = {p["_id"] for p in purchases}
+            stored = self._conn.execute(
+                "SELECT id FROM purchases WHERE account_id = ?", (account_id,)
+            ).fetchall()
+            self._conn.executemany(
+                "DELETE FROM purchases WHERE id = ?",
+                [(row["id"],) for row in stored if row["id"] not in current],
+            )
+            changes = self._conn.total_changes - before
+
+            if changes:
+                self._conn.execute(
+                    "INSERT INTO customer_versions (customer_id, version) VALUES (?, 1) "
+                    "ON CONFLICT (customer_id) DO UPDATE SET version = version + 1",
+                    (customer_id,),
+                )
+            self._conn.execute(
+                "INSERT INTO sync_state (account_id, customer_id, synced_at) "
+                "VALUES (?, ?, ?) ON CONFLICT (account_id) DO UPDATE SET "
+                "customer_id = excluded.customer_id, synced_at = excluded.synced_at",
+                (account_id, customer_id, time.time()),
+            )
+        return changes
+
+    def data_version(self, customer_id: str) -> str:
+        """Stamp that changes whenever a sync changes the customer's purchases"""
+        with self._lock:
+            count, version = self._conn.execute(
+                "SELECT (SELECT COUNT(*) FROM purchases WHERE customer_id = ?), "
+                "COALESCE((SELECT version FROM customer_versions "
+                "WHERE customer_id = ?), 0)",
+                (str(customer_id), str(customer_id)),
+            ).fetchone()
+        return f"{count}:{version}"
+
+    def get_summary(self, customer_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary, data_version, generated_at FROM spending_summaries "
+                "WHERE customer_id = ?",
+                (str(customer_id),),
+            ).fetchone()
+        return dict(row) if row else None
+
+    def put_summary(self, customer_id: str, summary: str, data_version: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO spending_summaries "
+                "(customer_id, summary, data_version, generated_at) VALUES (?, ?, ?, ?)",
+                (str(customer_id), summary, data_version, time.time()),
+            )
+
+    def query(
+        self,
+        customer_id: Optional[str] = None,
+        account_ids: Optional[List[str]] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Purchases by user, account and inclusive YYYY-MM-DD date range"""
+        clauses, params = [], []
+        if customer_id is not None:
+            clauses.append("customer_id = ?")
+            params.append(str(customer_id))
+        if account_ids is not None:
+            if not account_ids:
+                return []
+            clauses.append(f"account_id IN ({','.join('?' * len(account_ids))})")
+            params.extend(account_ids)
+        if start_date is not None:
+            clauses.append("purchase_date >= ?")
+            params.append(start_date)
+        if end_date is not None:
+            clauses.append("purchase_date <= ?")
+            params.append(end_date)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM purchases {where} "
+                "ORDER BY account_id, purchase_date, id",
+                params,
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+
+_store: Optional[TransactionStore] = None
+_store_lock = threading.Lock()
+
+
+def get_transaction_store() -> TransactionStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = TransactionStore(settings.TXN_STORE_PATH)
+    return _store
+
+
+def close_transaction_store() -> None:
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+            _store = None
@@ -0,0 +1,12 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# api is imported as a package from the repo root; transcription runs from its own directory
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "transcription"))
+
+# Settings that api.config requires; no real credentials are needed by the tests
+for name in ("SUPABASE_URL", "SUPABASE_KEY", "OPENAI_KEY", "OPENAI_ORG", "C1_KEY"):
+    os.environ.setdefault(name, "test")
@@ -0,0 +1,35 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("websockets")
+pytest.importorskip("uvicorn")
+
+import backplane_demo
+
+WORKERS = 2
+
+
+def _events(received):
+    return sorted(
+        (message["type"], message["call_id"])
+        if "type" in message
+        else (message["event"], message["call"]["call_id"])
+        for message in received
+    )
+
+
+def test_events_reach_subscribers_on_every_worker(tmp_path, monkeypatch):
+    monkeypatch.setenv("TRANSCRIPT_LOG_DIR", str(tmp_path / "transcript_log"))
+    received, _ = asyncio.run(
+        backplane_demo.run(WORKERS, broker_port=7890, base_port=8190)
+    )
+
+    expected = sorted(
+        (event, f"call-{i}")
+        for i in range(WORKERS)
+        for event in ("call_ended", "transcript_delta")
+    )
+    assert len(received) == WORKERS
+    for got in received:
+        assert _events(got) == expected
@@ -0,0 +1,49 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api import http_client
+from api.app import request_context_middleware
+from api.database import get_c1_accounts, nessie_cache
+
+ACCOUNT = {
+    "_id": "acc-1",
+    "type": "Checking",
+    "nickname": "Main",
+    "rewards": 0,
+    "balance": 100,
+    "account_number": None,
+    "customer_id": "cust-1",
+}
+
+
+def test_duplicate_upstream_reads_share_one_call(monkeypatch):
+    upstream = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        upstream.append(request.url.path)
+        return httpx.Response(200, json=[ACCOUNT])
+
+    monkeypatch.setattr(
+        http_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    nessie_cache.clear()
+
+    app = FastAPI()
+    app.middleware("http")(request_context_middleware)
+
+    @app.get("/accounts")
+    async def accounts():
+        first, second = await asyncio.gather(
+            get_c1_accounts("cust-1"), get_c1_accounts("cust-1")
+        )
+        return {"first": len(first), "second": len(second)}
+
+    response = TestClient(app).get("/accounts")
+
+    assert response.status_code == 200
+    assert response.json() == {"first": 1, "second": 1}
+    assert upstream == ["/customers/cust-1/accounts"]
+    assert response.headers["X-Upstream-Calls"] == "1"
@@ -0,0 +1,208 @@
+import asyncio
+import json
+import os
+import sys
+import uuid
+from typing import Awaitable, Callable, Optional, Set
+from urllib.parse import urlparse
+
+# Deliver a published event to this worker's own subscribers
+Deliver = Callable[[str, str, str, Optional[str]], Awaitable[None]]
+
+BACKPLANE_QUEUE_SIZE = int(os.environ.get("BACKPLANE_QUEUE_SIZE", 10000))
+BACKPLANE_RECONNECT_DELAY = float(os.environ.get("BACKPLANE_RECONNECT_DELAY", 1.0))
+# Frames carry whole transcripts, well past asyncio's 64 KiB line default
+FRAME_LIMIT = 16 * 1024 * 1024
+
+
+class InMemoryBackplane:
+    """Single-process backplane: publishing is local delivery"""
+
+    def __init__(self):
+        self._deliver: Optional[Deliver] = None
+        self.published = 0
+
+    async def start(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+
+    async def stop(self) -> None:
+        self._deliver = None
+
+    async def publish(
+        self, topic: str, event: str, message: str, key: Optional[str] = None
+    ) -> None:
+        self.published += 1
+        if self._deliver is not None:
+            await self._deliver(topic, event, message, key)
+
+    def stats(self) -> dict:
+        return {"backend": "memory", "published": self.published}
+
+
+class SocketBackplane:
+    """Relays events between workers through a broker (see run_broker).
+
+    Events are delivered to local subscribers immediately and forwarded to the
+    broker from a bounded queue, so a slow or missing broker never stalls the
+    publisher. The broker fans each frame out to every other worker.
+    """
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.worker_id = uuid.uuid4().hex
+        self.published = 0
+        self.received = 0
+        self.dropped = 0
+        self.connected = False
+        self._deliver: Optional[Deliver] = None
+        self._outbox: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+        self._outbox = asyncio.Queue(BACKPLANE_QUEUE_SIZE)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self._deliver = None
+
+    async def publish(
+        self, topic: str, event: str, message: str, key: Optional[str] = None
+    ) -> None:
+        self.published += 1
+        if self._deliver is not None:
+            await self._deliver(topic, event, message, key)
+        if self._outbox is None:
+            return
+        frame = json.dumps(
+            {
+                "origin": self.worker_id,
+                "topic": topic,
+                "event": event,
+                "message": message,
+                "key": key,
+            }
+        )
+        try:
+            self._outbox.put_nowait(frame)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(
+                    self.host, self.port, limit=FRAME_LIMIT
+                )
+            except OSError as e:
+                print(f"Backplane broker {self.host}:{self.port} unreachable: {e}")
+                await asyncio.sleep(BACKPLANE_RECONNECT_DELAY)
+                continue
+
+            self.connected = True
+            print(f"Backplane connected to broker {self.host}:{self.port}")
+            tasks = [
+                asyncio.create_task(self._send(writer)),
+                asyncio.create_task(self._receive(reader)),
+            ]
+            try:
+                await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                self.connected = False
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                writer.close()
+            print("Backplane lost broker connection, reconnecting")
+            await asyncio.sleep(BACKPLANE_RECONNECT_DELAY)
+
+    async def _send(self, writer: asyncio.StreamWriter) -> None:
+        while True:
+            frame = await self._outbox.get()
+            writer.write(frame.encode() + b"\n")
+            await writer.drain()
+
+    async def _receive(self, reader: asyncio.StreamReader) -> None:
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            try:
+                frame = json.loads(line)
+            except ValueError:
+                continue
+            if frame.get("origin") == self.worker_id:
+                continue  # Already delivered locally
+            self.received += 1
+            await self._deliver(
+                frame["topic"], frame["event"], frame["message"], frame.get("key")
+            )
+
+    def stats(self) -> dict:
+        return {
+            "backend": "socket",
+            "broker": f"{self.host}:{self.port}",
+            "connected": self.connected,
+            "published": self.published,
+            "received": self.received,
+            "dropped": self.dropped,
+            "queued": self._outbox.qsize() if self._outbox is not None else 0,
+        }
+
+
+def create_backplane(url: Optional[str] = None):
+    """Backplane for BACKPLANE_URL: unset/"memory://" or "tcp://host:port" """
+    url = url or os.environ.get("BACKPLANE_URL", "memory://")
+    parsed = urlparse(url)
+    if parsed.scheme == "memory":
+        return InMemoryBackplane()
+    if parsed.scheme == "tcp":
+        return SocketBackplane(parsed.hostname or "127.0.0.1", parsed.port or 7777)
+    raise ValueError(f"Unsupported BACKPLANE_URL: {url}")
+
+
+# -----------------------------
+# Broker: relays every frame from one worker to all the others.
+# Run with: python backplane.py [host] [port]
+# -----------------------------
+async def run_broker(host: str = "127.0.0.1", port: int = 7777) -> None:
+    workers: Set[asyncio.StreamWriter] = set()
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        workers.add(writer)
+        print(f"Worker connected to broker. Total: {len(workers)}")
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                for other in list(workers):
+                    if other is writer:
+                        continue
+                    other.write(line)
+                await asyncio.gather(
+                    *(other.drain() for other in list(workers) if other is not writer),
+                    return_exceptions=True,
+                )
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            workers.discard(writer)
+            writer.close()
+            print(f"Worker disconnected from broker. Total: {len(workers)}")
+
+    server = await asyncio.start_server(handle, host, port, limit=FRAME_LIMIT)
+    print(f"Backplane broker listening on {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    host = sys.argv[1] if len(sys.argv) > 1 else "127.0.0.1"
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 7777
+    asyncio.run(run_broker(host, port))
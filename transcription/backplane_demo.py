@@ -0,0 +1,129 @@
+"""Multi-process backplane check: events published on one worker reach all.
+
+Starts a broker and several uvicorn workers (separate processes on separate
+ports), subscribes a /realtime client on every worker, then publishes from
+each worker in turn (an update_only over /llm-websocket and a /webhook post)
+and verifies every subscriber saw every event.
+
+Run from this directory: python backplane_demo.py [workers]
+tests/test_backplane.py runs the same check under pytest.
+"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import List, Tuple
+
+import httpx
+import websockets
+
+BROKER_PORT = 7790
+BASE_PORT = 8090
+
+
+def spawn(args, env=None):
+    return subprocess.Popen(
+        [sys.executable, *args],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env={**os.environ, **(env or {})},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+async def wait_until_up(port: int) -> None:
+    async with httpx.AsyncClient() as client:
+        for _ in range(100):
+            try:
+                stats = (await client.get(f"http://127.0.0.1:{port}/stats")).json()
+                if stats["backplane"]["connected"]:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"worker on port {port} did not start")
+
+
+async def collect(ws, received: list) -> None:
+    async for text in ws:
+        received.append(json.loads(text))
+
+
+async def run(
+    workers: int, broker_port: int = BROKER_PORT, base_port: int = BASE_PORT
+) -> Tuple[List[List[dict]], float]:
+    """Messages each worker's subscriber received, and how long delivery took"""
+    ports = [base_port + i for i in range(workers)]
+    procs = [spawn(["backplane.py", "127.0.0.1", str(broker_port)])]
+    await asyncio.sleep(0.5)
+    env = {"BACKPLANE_URL": f"tcp://127.0.0.1:{broker_port}"}
+    procs += [
+        spawn(["-m", "uvicorn", "main:app", "--port", str(port)], env) for port in ports
+    ]
+    try:
+        await asyncio.gather(*(wait_until_up(port) for port in ports))
+
+        subscribers = [
+            await websockets.connect(f"ws://127.0.0.1:{port}/realtime") for port in ports
+        ]
+        received = [[] for _ in ports]
+        readers = [
+            asyncio.create_task(collect(ws, got))
+            for ws, got in zip(subscribers, received)
+        ]
+
+        started = time.perf_counter()
+        async with httpx.AsyncClient() as client:
+            for i, port in enumerate(ports):
+                call_id = f"call-{i}"
+                async with websockets.connect(
+                    f"ws://127.0.0.1:{port}/llm-websocket/{call_id}"
+                ) as retell:
+                    await retell.recv()  # config
+                    await retell.send(
+                        json.dumps(
+                            {
+                                "interaction_type": "update_only",
+                                "transcript": [{"role": "user", "content": f"hi {i}"}],
+                            }
+                        )
+                    )
+                    await asyncio.sleep(0.05)
+                await client.post(
+                    f"http://127.0.0.1:{port}/webhook",
+                    json={"event": "call_ended", "call": {"call_id": call_id}},
+                )
+
+        expected = 2 * workers
+        for _ in range(50):
+            if all(len(got) >= expected for got in received):
+                break
+            await asyncio.sleep(0.1)
+        elapsed = time.perf_counter() - started
+
+        for reader in readers:
+            reader.cancel()
+        for ws in subscribers:
+            await ws.close()
+        return received, elapsed
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait()
+
+
+async def main(workers: int) -> int:
+    received, elapsed = await run(workers)
+    expected = 2 * workers
+    ok = all(len(got) == expected for got in received)
+    for i, got in enumerate(received):
+        print(f"worker :{BASE_PORT + i} subscriber received {len(got)}/{expected} events")
+    print(f"{'OK' if ok else 'FAILED'}: {workers} workers in {elapsed:.2f}s")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 3)))
@@ -0,0 +1,274 @@
+import asyncio
+import json
+import os
+from collections import OrderedDict
+from typing import Callable, Dict, FrozenSet, Iterable, Optional, Set
+
+from fastapi import WebSocket
+
+# What to do when a client's outbound queue is full:
+#   drop_oldest - discard the oldest queued message
+#   coalesce    - replace a queued message with the same key (e.g. a redelivered
+#                 webhook for the same call and event), otherwise drop the oldest
+#   disconnect  - close the client; it can reconnect and start fresh
+OVERFLOW_POLICIES = ("drop_oldest", "coalesce", "disconnect")
+
+CLIENT_QUEUE_SIZE = int(os.environ.get("CLIENT_QUEUE_SIZE", 256))
+CLIENT_OVERFLOW_POLICY = os.environ.get("CLIENT_OVERFLOW_POLICY", "coalesce")
+CLIENT_SEND_TIMEOUT = float(os.environ.get("CLIENT_SEND_TIMEOUT", 5.0))
+
+# Topics are call_ids; "*" matches every call
+WILDCARD = "*"
+
+# Shorthands a client may use in an event filter
+EVENT_GROUPS = {
+    "lifecycle": frozenset({"call_started", "call_ended", "call_analyzed"}),
+    "transcript": frozenset({"transcript_delta", "transcript_snapshot"}),
+}
+
+
+def expand_events(events: Optional[Iterable[str]]) -> Optional[FrozenSet[str]]:
+    """Event filter with group names expanded; None means every event"""
+    if events is None:
+        return None
+    expanded = set()
+    for event in events:
+        expanded |= EVENT_GROUPS.get(event, {event})
+    return frozenset(expanded)
+
+
+class ClientConnection:
+    """One UI socket with its own bounded outbound queue and writer task"""
+
+    def __init__(self, websocket: WebSocket, max_queue: int, overflow: str):
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.overflow = overflow
+        # key -> message; unkeyed messages get a unique counter key
+        self.queue: "OrderedDict[object, str]" = OrderedDict()
+        self.dropped = 0
+        self.coalesced = 0
+        self.sent = 0
+        self.closed = False
+        # topic -> event filter (None = all events)
+        self.subscriptions: Dict[str, Optional[FrozenSet[str]]] = {}
+        # Receives everything until it sends its first subscribe/unsubscribe
+        self.default_subscription = True
+        self._counter = 0
+        self._ready = asyncio.Event()
+        self._writer: Optional[asyncio.Task] = None
+
+    def offer(self, message: str, key: Optional[str] = None) -> bool:
+        """Queue a message without waiting; False means the client must be dropped"""
+        if self.closed:
+            return False
+        if key is not None and self.overflow == "coalesce" and key in self.queue:
+            # Newer state for the same key supersedes the queued one, in its place
+            self.queue[key] = message
+            self.coalesced += 1
+            return True
+        if len(self.queue) >= self.max_queue:
+            if self.overflow == "disconnect":
+                return False
+            self.queue.popitem(last=False)
+            self.dropped += 1
+        if key is None or key in self.queue:
+            self._counter += 1
+            key = self._counter
+        self.queue[key] = message
+        self._ready.set()
+        return True
+
+    async def _write(self, on_dead) -> None:
+        try:
+            while True:
+                await self._ready.wait()
+                while self.queue:
+                    _, message = self.queue.popitem(last=False)
+                    await asyncio.wait_for(
+                        self.websocket.send_text(message), CLIENT_SEND_TIMEOUT
+                    )
+                    self.sent += 1
+                self._ready.clear()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Evicting WebSocket client after failed send: {e!r}")
+            await on_dead(self)
+
+    def start(self, on_dead) -> None:
+        self._writer = asyncio.create_task(self._write(on_dead))
+
+    def stop(self) -> None:
+        self.closed = True
+        if self._writer is not None and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+
+    async def close(self, code: int = 1000) -> None:
+        if self.closed:
+            return
+        self.stop()
+        try:
+            await self.websocket.close(code)
+        except Exception:
+            pass  # Already gone
+
+    def wants(self, topic: str, event: str) -> bool:
+        for name in (topic, WILDCARD):
+            if name in self.subscriptions:
+                events = self.subscriptions[name]
+                if events is None or event in events:
+                    return True
+        return False
+
+    def stats(self) -> dict:
+        return {
+            "subscriptions": {
+                topic: sorted(events) if events is not None else None
+                for topic, events in self.subscriptions.items()
+            },
+            "queued": len(self.queue),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+        }
+
+
+class ConnectionManager:
+    """Fans messages out to UI clients without ever awaiting a client send.
+
+    publish() only enqueues; each client's writer task drains its
+    own queue, so a slow or dead dashboard cannot stall the others or the caller.
+
+    Clients subscribe by sending JSON on their socket:
+        {"action": "subscribe", "call_id": "<id>" | "*", "events": [...]}
+        {"action": "unsubscribe", "call_id": "<id>"}   (omit call_id for all)
+        {"action": "snapshot", "call_id": "<id>"}
+    events is optional and may use EVENT_GROUPS names such as "lifecycle".
+    Until its first subscribe a client receives everything, as before.
+
+    Subscribing to a single call, or asking for a snapshot after spotting a
+    gap in transcript_delta seq numbers, sends the call's full transcript.
+    """
+
+    def __init__(
+        self,
+        max_queue: int = CLIENT_QUEUE_SIZE,
+        overflow: str = CLIENT_OVERFLOW_POLICY,
+        snapshot: Optional[Callable[[str], dict]] = None,
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}")
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.snapshot = snapshot
+        self.active_connections: Dict[WebSocket, ClientConnection] = {}
+        # topic -> clients subscribed to it, so publish only touches interested ones
+        self.topics: Dict[str, Set[ClientConnection]] = {}
+        self.evicted = 0
+
+    async def connect(self, websocket: WebSocket) -> ClientConnection:
+        await websocket.accept()
+        client = ClientConnection(websocket, self.max_queue, self.overflow)
+        self.active_connections[websocket] = client
+        self.subscribe(client, WILDCARD)
+        client.start(self._evict)
+        print(f"WebSocket client connected. Total: {len(self.active_connections)}")
+        return client
+
+    def disconnect(self, websocket: WebSocket):
+        client = self.active_connections.pop(websocket, None)
+        if client is not None:
+            self.unsubscribe(client)
+            client.stop()
+            print(f"WebSocket client disconnected. Total: {len(self.active_connections)}")
+
+    async def _evict(self, client: ClientConnection) -> None:
+        if self.active_connections.pop(client.websocket, None) is None:
+            return
+        self.unsubscribe(client)
+        self.evicted += 1
+        print(f"WebSocket client evicted. Total: {len(self.active_connections)}")
+        await client.close(1011)
+
+    def subscribe(
+        self,
+        client: ClientConnection,
+        topic: str,
+        events: Optional[Iterable[str]] = None,
+    ) -> None:
+        client.subscriptions[topic] = expand_events(events)
+        self.topics.setdefault(topic, set()).add(client)
+
+    def unsubscribe(self, client: ClientConnection, topic: Optional[str] = None) -> None:
+        names = list(client.subscriptions) if topic is None else [topic]
+        for name in names:
+            client.subscriptions.pop(name, None)
+            subscribers = self.topics.get(name)
+            if subscribers is not None:
+                subscribers.discard(client)
+                if not subscribers:
+                    del self.topics[name]
+
+    def handle_client_message(self, client: ClientConnection, text: str) -> None:
+        """Apply a subscribe/unsubscribe request sent by a UI client"""
+        try:
+            request = json.loads(text)
+        except ValueError:
+            return
+        if not isinstance(request, dict):
+            return
+        action = request.get("action")
+        topic = request.get("call_id")
+        events = request.get("events")
+        if topic is not None and not isinstance(topic, str):
+            client.offer(json.dumps({"error": "call_id must be a string"}))
+            return
+        if events is not None and not (
+            isinstance(events, list) and all(isinstance(e, str) for e in events)
+        ):
+            client.offer(json.dumps({"error": "events must be a list of strings"}))
+            return
+        if action == "subscribe":
+            if client.default_subscription:
+                # The first explicit subscribe replaces the receive-everything default
+                self.unsubscribe(client)
+            client.default_subscription = False
+            self.subscribe(client, topic or WILDCARD, events)
+        elif action == "unsubscribe":
+            client.default_subscription = False
+            self.unsubscribe(client, topic)
+        elif action == "snapshot" and topic:
+            self._send_snapshot(client, topic)
+            return
+        else:
+            return
+        client.offer(json.dumps({"subscriptions": client.stats()["subscriptions"]}))
+        if action == "subscribe" and topic and topic != WILDCARD:
+            # Joining mid-call: start from the full transcript, then apply deltas
+            self._send_snapshot(client, topic)
+
+    def _send_snapshot(self, client: ClientConnection, call_id: str) -> None:
+        if self.snapshot is not None:
+            client.offer(json.dumps(self.snapshot(call_id)))
+
+    async def publish(
+        self, topic: str, event: str, message: str, key: Optional[str] = None
+    ):
+        """Queue message for the clients subscribed to topic (or "*") and event"""
+        candidates = self.topics.get(topic, set()) | self.topics.get(WILDCARD, set())
+        for client in candidates:
+            # key lets the coalesce policy merge updates
+            if client.wants(topic, event) and not client.offer(message, key):
+                asyncio.create_task(self._evict(client))
+
+    def stats(self) -> dict:
+        return {
+            "clients": len(self.active_connections),
+            "overflow_policy": self.overflow,
+            "max_queue": self.max_queue,
+            "topics": {topic: len(clients) for topic, clients in self.topics.items()},
+            "evicted": self.evicted,
+            "queued": sum(len(c.queue) for c in self.active_connections.values()),
+            "dropped": sum(c.dropped for c in self.active_connections.values()),
+        }
@@ -0,0 +1,364 @@
+"""Synthetic Retell load generator and latency harness for this server.
+
+At each concurrency level it runs N simulated Retell LLM-websocket sessions
+(call_details, then update_only / ping_pong / response_required at the given
+rates), M /realtime subscribers and call_started/call_ended webhook posts,
+then reports:
+
+  - end-to-end broadcast latency (update_only sent -> transcript_delta received)
+  - ping_pong round-trip time
+  - webhook ack latency
+  - updates not delivered to subscribers (coalesced or dropped by the server)
+  - server CPU and peak RSS (Linux /proc; needs --spawn or --server-pid)
+
+Examples, from this directory:
+    python loadtest.py --spawn --levels 10,50,100 --subscribers 20
+    python loadtest.py --url http://127.0.0.1:8080 --server-pid 1234 --json out.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import httpx
+import websockets
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def percentiles(samples: List[float]) -> Dict[str, Optional[float]]:
+    if not samples:
+        return {"n": 0, "p50": None, "p90": None, "p99": None, "max": None}
+    ordered = sorted(samples)
+
+    def at(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)
+
+    return {
+        "n": len(ordered),
+        "p50": at(0.50),
+        "p90": at(0.90),
+        "p99": at(0.99),
+        "max": round(ordered[-1] * 1000, 2),
+    }
+
+
+class ProcessSampler:
+    """CPU% and peak RSS of the server process from /proc"""
+
+    def __init__(self, pid: Optional[int]):
+        self.pid = pid
+        self.peak_rss_mb = 0.0
+        self._start_cpu = self._start_wall = None
+
+    def _cpu_seconds(self) -> Optional[float]:
+        try:
+            with open(f"/proc/{self.pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+        except (OSError, IndexError, TypeError):
+            return None
+
+    def _rss_mb(self) -> Optional[float]:
+        try:
+            with open(f"/proc/{self.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) / 1024
+        except (OSError, TypeError):
+            return None
+        return None
+
+    def start(self) -> None:
+        self.peak_rss_mb = 0.0
+        self._start_cpu = self._cpu_seconds()
+        self._start_wall = time.perf_counter()
+
+    def sample(self) -> None:
+        rss = self._rss_mb()
+        if rss is not None:
+            self.peak_rss_mb = max(self.peak_rss_mb, rss)
+
+    def result(self) -> dict:
+        end_cpu = self._cpu_seconds()
+        if self._start_cpu is None or end_cpu is None:
+            return {"cpu_percent": None, "peak_rss_mb": None}
+        wall = time.perf_counter() - self._start_wall
+        return {
+            "cpu_percent": round((end_cpu - self._start_cpu) / wall * 100, 1),
+            "peak_rss_mb": round(self.peak_rss_mb, 1),
+        }
+
+
+class Level:
+    """Counters and samples for one concurrency level"""
+
+    def __init__(self):
+        self.sent_at: Dict[str, float] = {}  # update marker -> send time
+        self.broadcast_latency: List[float] = []
+        self.ping_rtt: List[float] = []
+        self.webhook_latency: List[float] = []
+        self.updates_sent = 0
+        self.deltas_received = 0
+        self.webhook_errors = 0
+        self.session_errors = 0
+
+
+async def retell_session(
+    ws_url: str, http: httpx.AsyncClient, args, level: Level, stop: asyncio.Event
+):
+    call_id = f"load-{uuid.uuid4().hex[:12]}"
+    await post_webhook(http, level, "call_started", call_id)
+    try:
+        async with websockets.connect(
+            f"{ws_url}/llm-websocket/{call_id}", max_size=None
+        ) as ws:
+            await ws.recv()  # config
+            await ws.send(
+                json.dumps(
+                    {
+                        "interaction_type": "call_details",
+                        "call": {"call_id": call_id, "from_number": "+15555550100"},
+                    }
+                )
+            )
+
+            async def read_pongs():
+                async for text in ws:
+                    message = json.loads(text)
+                    if message.get("response_type") == "ping_pong":
+                        level.ping_rtt.append(
+                            time.perf_counter() - message["timestamp"] / 1e6
+                        )
+
+            reader = asyncio.create_task(read_pongs())
+            transcript = []
+            response_id = 0
+            loop = asyncio.get_running_loop()
+            next_update = next_ping = next_response = loop.time()
+            try:
+                while not stop.is_set():
+                    now = loop.time()
+                    if now >= next_update:
+                        # Alternate between growing the last utterance and a new one
+                        if not transcript or len(transcript[-1]["content"]) > 80:
+                            role = "agent" if len(transcript) % 2 else "user"
+                            transcript.append({"role": role, "content": ""})
+                        marker = uuid.uuid4().hex[:8]
+                        transcript[-1] = {
+                            "role": transcript[-1]["role"],
+                            "content": transcript[-1]["content"] + " word",
+                            "marker": marker,
+                        }
+                        level.sent_at[marker] = time.perf_counter()
+                        await ws.send(
+                            json.dumps(
+                                {"interaction_type": "update_only", "transcript": transcript}
+                            )
+                        )
+                        level.updates_sent += 1
+                        next_update += 1 / args.update_rate
+                    if now >= next_ping:
+                        await ws.send(
+                            json.dumps(
+                                {
+                                    "interaction_type": "ping_pong",
+                                    # µs of the shared perf_counter clock, echoed back
+                                    "timestamp": int(time.perf_counter() * 1e6),
+                                }
+                            )
+                        )
+                        next_ping += args.ping_interval
+                    if now >= next_response:
+                        response_id += 1
+                        await ws.send(
+                            json.dumps(
+                                {
+                                    "interaction_type": "response_required",
+                                    "response_id": response_id,
+                                    "transcript": transcript,
+                                }
+                            )
+                        )
+                        next_response += args.response_interval
+                    await asyncio.sleep(
+                        max(0.0, min(next_update, next_ping, next_response) - loop.time())
+                    )
+            finally:
+                reader.cancel()
+    except (OSError, websockets.WebSocketException) as e:
+        level.session_errors += 1
+        print(f"Retell session {call_id} failed: {e!r}", file=sys.stderr)
+    await post_webhook(http, level, "call_ended", call_id)
+
+
+async def post_webhook(http: httpx.AsyncClient, level: Level, event: str, call_id: str):
+    started = time.perf_counter()
+    try:
+        response = await http.post(
+            "/webhook", json={"event": event, "call": {"call_id": call_id}}
+        )
+        if response.status_code == 204:
+            level.webhook_latency.append(time.perf_counter() - started)
+        else:
+            level.webhook_errors += 1
+    except httpx.HTTPError:
+        level.webhook_errors += 1
+
+
+async def subscriber(ws_url: str, level: Level, ready: asyncio.Event, count: List[int]):
+    async with websockets.connect(f"{ws_url}/realtime", max_size=None) as ws:
+        count[0] += 1
+        if count[0] == count[1]:
+            ready.set()
+        async for text in ws:
+            received_at = time.perf_counter()
+            message = json.loads(text)
+            if message.get("type") != "transcript_delta" or not message["utterances"]:
+                continue
+            level.deltas_received += 1
+            sent_at = level.sent_at.get(message["utterances"][-1].get("marker"))
+            if sent_at is not None:
+                level.broadcast_latency.append(received_at - sent_at)
+
+
+async def run_level(base_url: str, calls: int, args, sampler: ProcessSampler) -> dict:
+    ws_url = base_url.replace("http", "ws", 1)
+    level = Level()
+    stop = asyncio.Event()
+    ready = asyncio.Event()
+    connected = [0, args.subscribers]
+    sampler.start()
+
+    subscribers = [
+        asyncio.create_task(subscriber(ws_url, level, ready, connected))
+        for _ in range(args.subscribers)
+    ]
+    if args.subscribers:
+        await asyncio.wait_for(ready.wait(), 30)
+
+    limits = httpx.Limits(max_connections=args.webhook_connections)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as http:
+        sessions = [
+            asyncio.create_task(retell_session(ws_url, http, args, level, stop))
+            for _ in range(calls)
+        ]
+        deadline = time.perf_counter() + args.duration
+        while time.perf_counter() < deadline:
+            sampler.sample()
+            await asyncio.sleep(min(1.0, deadline - time.perf_counter()))
+        stop.set()
+        await asyncio.gather(*sessions, return_exceptions=True)
+
+    await asyncio.sleep(args.drain)  # let in-flight broadcasts arrive
+    sampler.sample()
+    for task in subscribers:
+        task.cancel()
+    await asyncio.gather(*subscribers, return_exceptions=True)
+
+    expected = level.updates_sent * args.subscribers
+    return {
+        "calls": calls,
+        "subscribers": args.subscribers,
+        "updates_sent": level.updates_sent,
+        "deltas_expected": expected,
+        "deltas_received": level.deltas_received,
+        "undelivered": max(0, expected - level.deltas_received),
+        "broadcast_latency_ms": percentiles(level.broadcast_latency),
+        "ping_rtt_ms": percentiles(level.ping_rtt),
+        "webhook_ack_ms": percentiles(level.webhook_latency),
+        "webhook_errors": level.webhook_errors,
+        "session_errors": level.session_errors,
+        "server": sampler.result(),
+    }
+
+
+def print_report(results: List[dict]) -> None:
+    def p50_p99(stats: dict) -> str:
+        return f"{stats['p50']}/{stats['p99']}"
+
+    header = (
+        f"{'calls':>6} {'subs':>5} {'updates':>8} {'undeliv':>8} "
+        f"{'bcast p50/p99 ms':>18} {'ping p50/p99 ms':>17} {'hook p99':>9} "
+        f"{'errs':>5} {'cpu%':>6} {'rss MB':>7}"
+    )
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        server = r["server"]
+        print(
+            f"{r['calls']:>6} {r['subscribers']:>5} {r['updates_sent']:>8} "
+            f"{r['undelivered']:>8} {p50_p99(r['broadcast_latency_ms']):>18} "
+            f"{p50_p99(r['ping_rtt_ms']):>17} {str(r['webhook_ack_ms']['p99']):>9} "
+            f"{r['webhook_errors'] + r['session_errors']:>5} "
+            f"{str(server['cpu_percent']):>6} {str(server['peak_rss_mb']):>7}"
+        )
+
+
+def spawn_server(port: int) -> subprocess.Popen:
+    env = {**os.environ, "TRANSCRIPT_LOG_DIR": tempfile.mkdtemp(prefix="loadtest-log-")}
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+
+
+async def wait_until_up(base_url: str) -> None:
+    async with httpx.AsyncClient(base_url=base_url) as http:
+        for _ in range(100):
+            try:
+                await http.get("/stats")
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError(f"server at {base_url} did not start")
+
+
+async def main(args) -> None:
+    server = None
+    base_url, pid = args.url.rstrip("/"), args.server_pid
+    if args.spawn:
+        server = spawn_server(args.port)
+        base_url, pid = f"http://127.0.0.1:{args.port}", server.pid
+    try:
+        await wait_until_up(base_url)
+        sampler = ProcessSampler(pid)
+        results = []
+        for calls in (int(n) for n in args.levels.split(",")):
+            print(f"Running {calls} calls x {args.subscribers} subscribers for {args.duration}s...")
+            results.append(await run_level(base_url, calls, args, sampler))
+        print()
+        print_report(results)
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(results, f, indent=2)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument("--spawn", action="store_true", help="start the server locally")
+    parser.add_argument("--port", type=int, default=8099, help="port for --spawn")
+    parser.add_argument("--server-pid", type=int, help="pid to sample CPU/RSS from")
+    parser.add_argument("--levels", default="5,20,50", help="concurrent calls per level")
+    parser.add_argument("--subscribers", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per level")
+    parser.add_argument("--update-rate", type=float, default=4.0, help="update_only/s per call")
+    parser.add_argument("--ping-interval", type=float, default=2.0)
+    parser.add_argument("--response-interval", type=float, default=5.0)
+    parser.add_argument("--webhook-connections", type=int, default=20)
+    parser.add_argument("--drain", type=float, default=2.0, help="seconds to wait after each level")
+    parser.add_argument("--json", help="also write results to this file")
+    asyncio.run(main(parser.parse_args()))
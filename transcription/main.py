@@ -1,36 +1,65 @@
 import os
 import json
-from typing import List
+import asyncio
+from contextlib import asynccontextmanager
 
 import uvicorn
 from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
 from fastapi.responses import JSONResponse, Response
 
-app = FastAPI()
+from backplane import create_backplane
+from connections import ConnectionManager
+from supervisor import CallSupervisor
+from transcript_log import TranscriptLog
+from transcripts import TRANSCRIPT_SNAPSHOT_EVERY, TranscriptMirror, TranscriptState
+from webhooks import WebhookQueue
 
 # -----------------------------
 # Connection Manager for broadcasting realtime events to UI clients.
+# See connections.py: each client has a bounded queue drained by its own writer.
 # -----------------------------
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+transcripts = TranscriptMirror()
+manager = ConnectionManager(snapshot=transcripts.snapshot)
 
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-        print(f"WebSocket client connected. Total: {len(self.active_connections)}")
+# -----------------------------
+# Backplane carrying published events to every worker's manager.
+# BACKPLANE_URL=tcp://host:port to share events across workers (see backplane.py).
+# -----------------------------
+backplane = create_backplane()
+
+
+# -----------------------------
+# On-disk history of every call's events, for replay (see transcript_log.py).
+# -----------------------------
+event_log = TranscriptLog()
 
-    def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-            print(f"WebSocket client disconnected. Total: {len(self.active_connections)}")
 
-    async def broadcast(self, message: str):
-        print(f"Broadcasting message to {len(self.active_connections)} clients.")
-        for connection in self.active_connections:
-            await connection.send_text(message)
+async def deliver(topic: str, event: str, message: str, key=None):
+    """Handle an event published on any worker for this worker's clients"""
+    transcripts.observe(event, message)
+    if event == "call_ended":
+        transcripts.forget(topic)
+    if event != "transcript_resync":  # mirror-only, and derivable from the deltas
+        # Every worker sees every event here; only the one holding the log's lock writes
+        event_log.append(topic, event, message)
+        await manager.publish(topic, event, message, key)
 
-manager = ConnectionManager()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await event_log.start()
+    await backplane.start(deliver)
+    webhook_queue.start()
+    yield
+    await webhook_queue.stop()
+    await backplane.stop()
+    await event_log.stop()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Live Retell calls on this worker, for /stats
+call_supervisors = {}
 
 # -----------------------------
 # Dedicated WebSocket endpoint for LLM integration per call.
@@ -39,6 +68,7 @@ manager = ConnectionManager()
 # -----------------------------
 @app.websocket("/llm-websocket/{call_id}")
 async def websocket_handler(websocket: WebSocket, call_id: str):
+    supervisor = None
     try:
         await websocket.accept()
         llm_client = None
@@ -58,10 +88,9 @@ async def websocket_handler(websocket: WebSocket, call_id: str):
             "response_id": 1,
         }
         await websocket.send_json(config)
-        response_id = 0
+        transcript = TranscriptState(call_id)
 
         async def handle_message(request_json):
-            nonlocal response_id
             nonlocal llm_client
             interaction_type = request_json.get("interaction_type")
             print(f"Received interaction_type: {interaction_type}")
@@ -90,10 +119,17 @@ async def websocket_handler(websocket: WebSocket, call_id: str):
 
             # NEW: Check if interaction_type is update_only.
             if interaction_type == "update_only":
-                # Here, instead of ignoring update_only events, we broadcast them
-                # to our realtime clients so that the UI can display live transcription.
-                print(f"Update only event received for call {call_id}. Broadcasting to UI.")
-                await manager.broadcast(json.dumps(request_json))
+                # Each update carries the whole transcript so far; UI clients only
+                # get what changed (see transcripts.py).
+                delta = transcript.update(request_json.get("transcript", []))
+                if delta is None:
+                    return
+                print(f"Transcript delta seq={delta['seq']} for call {call_id}. Broadcasting to UI.")
+                await backplane.publish(call_id, "transcript_delta", json.dumps(delta))
+                if delta["seq"] % TRANSCRIPT_SNAPSHOT_EVERY == 0:
+                    await backplane.publish(
+                        call_id, "transcript_resync", json.dumps(transcript.snapshot())
+                    )
                 return
 
             if interaction_type in ("response_required", "reminder_required"):
@@ -107,15 +143,15 @@ async def websocket_handler(websocket: WebSocket, call_id: str):
                 # )
                 # async for event in llm_client.draft_response(request):
                 #     await websocket.send_json(event.__dict__)
-                #     if request.response_id < response_id:
-                #         break  # New response needed, abandon this one.
+                # A newer response_id cancels this task (see supervisor.py).
                 print(f"Received {interaction_type} event with response_id={response_id}")
                 return
 
+        # Every task for this call is owned by its supervisor (see supervisor.py).
+        supervisor = CallSupervisor(call_id, handle_message)
+        call_supervisors[call_id] = supervisor
         async for data in websocket.iter_json():
-            # Create a task for handling each message.
-            import asyncio
-            asyncio.create_task(handle_message(data))
+            supervisor.submit(data)
 
     except WebSocketDisconnect:
         print(f"LLM WebSocket disconnected for {call_id}")
@@ -123,6 +159,10 @@ async def websocket_handler(websocket: WebSocket, call_id: str):
         print(f"Error in LLM WebSocket: {e} for {call_id}")
         await websocket.close(1011, "Server error")
     finally:
+        if supervisor is not None:
+            if call_supervisors.get(call_id) is supervisor:
+                del call_supervisors[call_id]
+            await supervisor.close()
         print(f"LLM WebSocket connection closed for {call_id}")
 
 # -----------------------------
@@ -131,39 +171,100 @@ async def websocket_handler(websocket: WebSocket, call_id: str):
 # -----------------------------
 @app.websocket("/realtime")
 async def realtime_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+    client = await manager.connect(websocket)
     try:
         while True:
-            # This endpoint is for broadcasting; optionally process incoming messages.
-            await websocket.receive_text()
-    except WebSocketDisconnect:
+            # Incoming messages manage this client's subscriptions (see connections.py).
+            manager.handle_client_message(client, await websocket.receive_text())
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError: the socket was already closed by an eviction
+        pass
+    finally:
         manager.disconnect(websocket)
 
 # -----------------------------
 # Webhook endpoint for Retell AI events.
 # Retell AI will POST events (e.g. call_started, call_ended, etc.) here.
+# The endpoint only enqueues; webhook_queue publishes them (see webhooks.py).
 # -----------------------------
+async def process_webhook(post_data: dict):
+    event = post_data.get("event")
+    call = post_data.get("call", {})
+    call_id = call.get("call_id", "unknown")
+    print(f"Processing webhook event: {event} for call {call_id}")
+
+    # Publish the webhook event to clients subscribed to this call or event.
+    broadcast_data = json.dumps({
+        "event": event,
+        "call": call
+    })
+    await backplane.publish(call_id, event, broadcast_data, key=f"{event}:{call_id}")
+
+webhook_queue = WebhookQueue(process_webhook)
+
 @app.post("/webhook")
 async def webhook_endpoint(request: Request):
     try:
         post_data = await request.json()
-        event = post_data.get("event")
-        call = post_data.get("call", {})
-        call_id = call.get("call_id", "unknown")
-        print(f"Received webhook event: {event} for call {call_id}")
-
-        # Broadcast the webhook event to all realtime clients.
-        broadcast_data = json.dumps({
-            "event": event,
-            "call": call
-        })
-        await manager.broadcast(broadcast_data)
+        if not isinstance(post_data, dict) or not isinstance(post_data.get("call", {}), dict):
+            return JSONResponse(status_code=400, content={"message": "Malformed webhook body"})
+        if not webhook_queue.enqueue(post_data):
+            # Full: have Retell retry later rather than lose the event
+            return JSONResponse(status_code=503, content={"message": "Webhook queue full"})
         # Return a 204 No Content response.
         return Response(status_code=204)
     except Exception as e:
         print(f"Error processing webhook: {e}")
         return JSONResponse(status_code=500, content={"message": "Internal Server Error"})
 
+# -----------------------------
+# Call history from the transcript log.
+# GET /calls lists logged calls; GET /calls/{call_id}/events returns a call's events.
+# -----------------------------
+@app.get("/calls")
+async def list_calls():
+    return {"calls": event_log.calls()}
+
+@app.get("/calls/{call_id}/events")
+async def call_events(call_id: str, since: float = None):
+    events = await asyncio.to_thread(lambda: list(event_log.read(call_id, since)))
+    return {"call_id": call_id, "events": events}
+
+# -----------------------------
+# Replay a past call to a client with its original timing.
+# Endpoint: /replay/{call_id}?speed=1.0 (speed=2 is twice as fast, 0 is no delay)
+# Sends each logged message as it was originally broadcast, then {"type": "replay_end"}.
+# -----------------------------
+@app.websocket("/replay/{call_id}")
+async def replay_endpoint(websocket: WebSocket, call_id: str, speed: float = 1.0):
+    await websocket.accept()
+    try:
+        events = await asyncio.to_thread(lambda: list(event_log.read(call_id)))
+        previous_ts = None
+        for entry in events:
+            if speed > 0 and previous_ts is not None:
+                await asyncio.sleep((entry["ts"] - previous_ts) / speed)
+            previous_ts = entry["ts"]
+            await websocket.send_text(entry["message"])
+        await websocket.send_json({"type": "replay_end", "call_id": call_id, "events": len(events)})
+        await websocket.close()
+    except WebSocketDisconnect:
+        print(f"Replay client disconnected for {call_id}")
+
+# -----------------------------
+# Broadcast stats (queue depth, drops, evictions).
+# -----------------------------
+@app.get("/stats")
+async def stats_endpoint():
+    return {
+        "connections": manager.stats(),
+        "backplane": backplane.stats(),
+        "transcripts": transcripts.stats(),
+        "event_log": event_log.stats(),
+        "webhooks": webhook_queue.stats(),
+        "calls": {call_id: sup.stats() for call_id, sup in call_supervisors.items()},
+    }
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8080))
     uvicorn.run("main:app", host="0.0.0.0", port=port, reload=True)
@@ -0,0 +1,132 @@
+import asyncio
+import os
+from collections import deque
+from typing import Awaitable, Callable, Optional, Set
+
+# Ordered events (call_details, ...) a call may have waiting before the oldest is dropped
+CALL_MAX_PENDING = int(os.environ.get("CALL_MAX_PENDING", 64))
+
+# Answered straight away, never queued behind slower work
+IMMEDIATE = ("ping_pong",)
+# Each one supersedes the previous generation
+RESPONSES = ("response_required", "reminder_required")
+
+
+class CallSupervisor:
+    """Owns every task started for one Retell call's LLM websocket.
+
+    - ping_pong is handled immediately in its own tracked task
+    - response_required/reminder_required run one at a time; a newer
+      response_id cancels the generation still running for an older one
+    - everything else runs in arrival order on a single worker. Only the
+      newest pending update_only is kept, since each carries the whole
+      transcript, so a burst of updates cannot pile up
+    - close() cancels and awaits all of it when the socket goes away
+    """
+
+    def __init__(
+        self,
+        call_id: str,
+        handle: Callable[[dict], Awaitable[None]],
+        max_pending: int = CALL_MAX_PENDING,
+    ):
+        self.call_id = call_id
+        self.handle = handle
+        self.max_pending = max_pending
+        self.response_id = -1
+        self.superseded = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.failed = 0
+        self.invalid = 0
+        self._pending: deque = deque()
+        self._ready = asyncio.Event()
+        self._immediate: Set[asyncio.Task] = set()
+        self._response: Optional[asyncio.Task] = None
+        self._worker = asyncio.create_task(self._drain())
+
+    def submit(self, request_json: dict) -> None:
+        if not isinstance(request_json, dict):
+            self._reject(request_json, "frame is not a JSON object")
+            return
+        interaction_type = request_json.get("interaction_type")
+        if interaction_type in IMMEDIATE:
+            task = asyncio.create_task(self._run(request_json))
+            self._immediate.add(task)
+            task.add_done_callback(self._immediate.discard)
+        elif interaction_type in RESPONSES:
+            self._respond(request_json)
+        else:
+            self._enqueue(request_json)
+
+    def _reject(self, request_json, reason: str) -> None:
+        """Drop a malformed frame; it must not end the call's socket"""
+        self.invalid += 1
+        print(f"Dropping frame for {self.call_id}, {reason}: {request_json!r:.200}")
+
+    def _respond(self, request_json: dict) -> None:
+        response_id = request_json.get("response_id")
+        if not isinstance(response_id, int) or isinstance(response_id, bool):
+            self._reject(request_json, "response_id is not an integer")
+            return
+        if response_id < self.response_id:
+            self.superseded += 1  # Arrived after a newer one; nothing to do
+            return
+        self.response_id = response_id
+        if self._response is not None and not self._response.done():
+            self._response.cancel()
+            self.superseded += 1
+        self._response = asyncio.create_task(self._run(request_json))
+
+    def _enqueue(self, request_json: dict) -> None:
+        if request_json.get("interaction_type") == "update_only":
+            for i, pending in enumerate(self._pending):
+                if pending.get("interaction_type") == "update_only":
+                    del self._pending[i]
+                    self.coalesced += 1
+                    break
+        if len(self._pending) >= self.max_pending:
+            self._pending.popleft()
+            self.dropped += 1
+        self._pending.append(request_json)
+        self._ready.set()
+
+    async def _drain(self) -> None:
+        while True:
+            await self._ready.wait()
+            while self._pending:
+                await self._run(self._pending.popleft())
+            self._ready.clear()
+
+    async def _run(self, request_json: dict) -> None:
+        try:
+            await self.handle(request_json)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failed += 1
+            print(
+                f"Error handling {request_json.get('interaction_type')} "
+                f"for {self.call_id}: {e!r}"
+            )
+
+    async def close(self) -> None:
+        tasks = [self._worker, *self._immediate]
+        if self._response is not None:
+            tasks.append(self._response)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._pending.clear()
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "responding": self._response is not None and not self._response.done(),
+            "response_id": self.response_id,
+            "superseded": self.superseded,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "invalid": self.invalid,
+        }
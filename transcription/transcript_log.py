@@ -0,0 +1,283 @@
+import asyncio
+import bisect
+import fcntl
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+TRANSCRIPT_LOG_DIR = os.environ.get("TRANSCRIPT_LOG_DIR", "transcript_log")
+TRANSCRIPT_LOG_SEGMENT_BYTES = int(
+    os.environ.get("TRANSCRIPT_LOG_SEGMENT_BYTES", 64 * 1024 * 1024)
+)
+TRANSCRIPT_LOG_FLUSH_INTERVAL = float(os.environ.get("TRANSCRIPT_LOG_FLUSH_INTERVAL", 0.05))
+TRANSCRIPT_LOG_BATCH_SIZE = int(os.environ.get("TRANSCRIPT_LOG_BATCH_SIZE", 512))
+# Index every Nth record of a call within a segment (its first is always indexed)
+TRANSCRIPT_LOG_INDEX_EVERY = int(os.environ.get("TRANSCRIPT_LOG_INDEX_EVERY", 64))
+
+# Record: 4-byte little-endian payload length, then the JSON payload
+HEADER = struct.Struct("<I")
+
+# Per segment: call_id -> {"samples": [(ts, offset), ...], "last": offset of its
+# last record}, so a read starts at a sample and stops after the call's last record
+SegmentIndex = Dict[str, dict]
+
+
+def _add_to_index(
+    index: SegmentIndex, counts: Dict[str, int], call_id: str, ts: float, offset: int
+) -> None:
+    call_index = index.setdefault(call_id, {"samples": [], "last": offset})
+    count = counts.get(call_id, 0)
+    if count % TRANSCRIPT_LOG_INDEX_EVERY == 0:
+        call_index["samples"].append((ts, offset))
+    call_index["last"] = offset
+    counts[call_id] = count + 1
+
+
+class TranscriptLog:
+    """Append-only, segment-rotated log of per-call events on disk.
+
+    append() only buffers; a background task writes batches from a worker
+    thread. Each segment keeps a sparse index (call_id -> (ts, offset)) so
+    reads jump straight to a call's records and scan them through mmap.
+    Closed segments persist their index next to them as segment-N.idx.
+
+    One process owns a log directory (an flock on LOCK); another worker
+    pointed at the same directory runs without logging. Since every worker
+    receives every published event, the owner logs calls from all workers.
+    """
+
+    def __init__(
+        self,
+        directory: str = TRANSCRIPT_LOG_DIR,
+        segment_bytes: int = TRANSCRIPT_LOG_SEGMENT_BYTES,
+    ):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.enabled = False
+        self.appended = 0
+        self.written = 0
+        self.batches = 0
+        self._buffer: List[Tuple[str, float, bytes]] = []
+        # Serialises _write_batch and _close: cancelling the flush task does not
+        # stop a write already running in its thread
+        self._write_lock = threading.Lock()
+        # Guards _indexes: the writer thread extends it while readers look it up
+        self._index_lock = threading.Lock()
+        self._indexes: Dict[int, SegmentIndex] = {}
+        self._counts: Dict[str, int] = {}  # records per call in the active segment
+        self._active = 0
+        self._file = None
+        self._lock_file = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def open(self) -> bool:
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock_file = open(os.path.join(self.directory, "LOCK"), "w")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            print(f"Transcript log {self.directory} is in use by another process; not logging")
+            self._lock_file.close()
+            self._lock_file = None
+            return False
+
+        numbers = sorted(
+            int(name[8:16])
+            for name in os.listdir(self.directory)
+            if name.startswith("segment-") and name.endswith(".log")
+        )
+        self._active = numbers[-1] if numbers else 0
+        for number in numbers[:-1]:
+            self._indexes[number] = self._load_index(number)
+        # The active segment has no saved index yet and may end in a torn write
+        self._indexes[self._active], self._counts = self._rebuild_index(self._active)
+        self._file = open(self._path(self._active), "ab")
+        self.enabled = True
+        return True
+
+    async def start(self) -> None:
+        if not await asyncio.to_thread(self.open):
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.enabled:
+            await asyncio.to_thread(self._write_batch, self._take())
+            await asyncio.to_thread(self._close)
+
+    def _close(self) -> None:
+        with self._write_lock:
+            self._file.close()
+            self._save_index(self._active)
+            self.enabled = False
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def append(self, call_id: str, event: str, message: str) -> None:
+        """Buffer one event; written to disk by the flush task shortly after"""
+        if not self.enabled:
+            return
+        ts = time.time()
+        record = json.dumps(
+            {"ts": ts, "call_id": call_id, "event": event, "message": message}
+        ).encode()
+        self._buffer.append((call_id, ts, record))
+        self.appended += 1
+        if len(self._buffer) >= TRANSCRIPT_LOG_BATCH_SIZE:
+            self._wakeup.set()
+
+    def _take(self) -> List[Tuple[str, float, bytes]]:
+        batch, self._buffer = self._buffer, []
+        return batch
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), TRANSCRIPT_LOG_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            batch = self._take()
+            if batch:
+                try:
+                    await asyncio.to_thread(self._write_batch, batch)
+                except OSError as e:
+                    print(f"Transcript log write failed, {len(batch)} events lost: {e}")
+
+    def _write_batch(self, batch: List[Tuple[str, float, bytes]]) -> None:
+        if not batch:
+            return
+        with self._write_lock:
+            self._write_locked(batch)
+
+    def _write_locked(self, batch: List[Tuple[str, float, bytes]]) -> None:
+        offset = self._file.tell()
+        chunks = []
+        for call_id, ts, record in batch:
+            if offset >= self.segment_bytes:
+                self._file.write(b"".join(chunks))
+                chunks = []
+                self._rotate()
+                offset = 0
+            with self._index_lock:
+                self._index_record(call_id, ts, offset)
+            chunks.append(HEADER.pack(len(record)))
+            chunks.append(record)
+            offset += HEADER.size + len(record)
+        self._file.write(b"".join(chunks))
+        self._file.flush()
+        self.written += len(batch)
+        self.batches += 1
+
+    def _index_record(self, call_id: str, ts: float, offset: int) -> None:
+        _add_to_index(self._indexes[self._active], self._counts, call_id, ts, offset)
+
+    def _rotate(self) -> None:
+        self._file.close()
+        self._save_index(self._active)
+        with self._index_lock:
+            self._active += 1
+            self._indexes[self._active] = {}
+            self._counts = {}
+        self._file = open(self._path(self._active), "ab")
+
+    def _path(self, number: int, suffix: str = ".log") -> str:
+        return os.path.join(self.directory, f"segment-{number:08d}{suffix}")
+
+    def _save_index(self, number: int) -> None:
+        tmp = self._path(number, ".idx.tmp")
+        with self._index_lock:
+            index = json.dumps(self._indexes[number])
+        with open(tmp, "w") as f:
+            f.write(index)
+        os.replace(tmp, self._path(number, ".idx"))
+
+    def _load_index(self, number: int) -> SegmentIndex:
+        if os.path.exists(self._path(number, ".idx")):
+            with open(self._path(number, ".idx")) as f:
+                return json.load(f)
+        return self._rebuild_index(number)[0]
+
+    def _rebuild_index(self, number: int) -> Tuple[SegmentIndex, Dict[str, int]]:
+        """Scan a segment for its index and per-call counts, dropping a torn tail"""
+        index: SegmentIndex = {}
+        counts: Dict[str, int] = {}
+        path = self._path(number)
+        end = 0
+        for offset, entry, end in self._scan(path, 0):
+            _add_to_index(index, counts, entry["call_id"], entry["ts"], offset)
+        if os.path.exists(path) and os.path.getsize(path) > end:
+            with open(path, "r+b") as f:
+                f.truncate(end)
+        return index, counts
+
+    def _scan(self, path: str, start: int) -> Iterator[Tuple[int, dict, int]]:
+        """(offset, entry, end offset) for each complete record from start"""
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            offset, size = start, len(buf)
+            while offset + HEADER.size <= size:
+                (length,) = HEADER.unpack_from(buf, offset)
+                end = offset + HEADER.size + length
+                if end > size:
+                    return  # Torn or not yet flushed
+                try:
+                    entry = json.loads(buf[offset + HEADER.size : end])
+                except ValueError:
+                    return
+                yield offset, entry, end
+                offset = end
+
+    def read(self, call_id: str, since: Optional[float] = None) -> Iterator[dict]:
+        """A call's logged events in order, optionally from timestamp since on"""
+        with self._index_lock:
+            segments = [
+                (number, list(call_index["samples"]), call_index["last"])
+                for number, index in sorted(self._indexes.items())
+                if (call_index := index.get(call_id)) is not None
+            ]
+        for number, samples, last in segments:
+            start = samples[0][1]
+            if since is not None:
+                # Last sampled record at or before since; scan forward from there
+                i = bisect.bisect_right([ts for ts, _ in samples], since) - 1
+                start = samples[max(i, 0)][1]
+            for offset, entry, _ in self._scan(self._path(number), start):
+                if offset > last:
+                    break
+                if entry["call_id"] != call_id:
+                    continue
+                if since is not None and entry["ts"] < since:
+                    continue
+                yield entry
+
+    def calls(self) -> List[str]:
+        seen = {}
+        with self._index_lock:
+            for number in sorted(self._indexes):
+                for call_id, call_index in self._indexes[number].items():
+                    seen.setdefault(call_id, call_index["samples"][0][0])
+        return sorted(seen, key=seen.get)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "segments": len(self._indexes),
+            "active_segment": self._active,
+            "buffered": len(self._buffer),
+            "appended": self.appended,
+            "written": self.written,
+            "batches": self.batches,
+        }
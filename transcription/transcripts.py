@@ -0,0 +1,110 @@
+import json
+import os
+from collections import OrderedDict
+from typing import List, Optional
+
+# Every Nth delta the origin also publishes a "transcript_resync" snapshot to
+# other workers' mirrors (not to clients) so a mirror that missed a frame,
+# e.g. a backplane drop, converges on its own
+TRANSCRIPT_SNAPSHOT_EVERY = int(os.environ.get("TRANSCRIPT_SNAPSHOT_EVERY", 50))
+# Calls whose transcript a worker keeps for snapshot requests
+TRANSCRIPT_MAX_CALLS = int(os.environ.get("TRANSCRIPT_MAX_CALLS", 1000))
+
+
+class TranscriptState:
+    """A call's transcript as seen so far, turned into deltas as it grows.
+
+    A delta {"base": i, "utterances": [...]} means: keep the first i
+    utterances and append the given ones. Retell resends the whole transcript
+    with each update_only, but usually only the last utterance changes or a
+    new one is appended, so deltas stay small however long the call runs.
+    """
+
+    def __init__(self, call_id: str):
+        self.call_id = call_id
+        self.utterances: List[dict] = []
+        self.seq = 0
+
+    def update(self, transcript: List[dict]) -> Optional[dict]:
+        """Adopt the full transcript from Retell; the delta to send, or None if unchanged"""
+        base = 0
+        common = min(len(self.utterances), len(transcript))
+        while base < common and self.utterances[base] == transcript[base]:
+            base += 1
+        if base == len(self.utterances) == len(transcript):
+            return None
+        self.utterances = list(transcript)
+        self.seq += 1
+        return self.delta(base)
+
+    def delta(self, base: int) -> dict:
+        return {
+            "type": "transcript_delta",
+            "call_id": self.call_id,
+            "seq": self.seq,
+            "base": base,
+            "utterances": self.utterances[base:],
+        }
+
+    def apply(self, delta: dict) -> bool:
+        """Apply a delta from the origin; False if a sequence gap was detected"""
+        in_order = delta["seq"] == self.seq + 1
+        del self.utterances[delta["base"] :]
+        self.utterances.extend(delta["utterances"])
+        self.seq = delta["seq"]
+        return in_order
+
+    def snapshot(self) -> dict:
+        return {
+            "type": "transcript_snapshot",
+            "call_id": self.call_id,
+            "seq": self.seq,
+            "utterances": self.utterances,
+        }
+
+
+class TranscriptMirror:
+    """This worker's copy of every live call's transcript, fed by published deltas.
+
+    Lets any worker answer a snapshot request, whichever worker holds the
+    call's Retell socket.
+    """
+
+    def __init__(self, max_calls: int = TRANSCRIPT_MAX_CALLS):
+        self.max_calls = max_calls
+        self.calls: "OrderedDict[str, TranscriptState]" = OrderedDict()
+        self.gaps = 0
+
+    def _state(self, call_id: str) -> TranscriptState:
+        state = self.calls.get(call_id)
+        if state is None:
+            state = self.calls[call_id] = TranscriptState(call_id)
+            if len(self.calls) > self.max_calls:
+                self.calls.popitem(last=False)
+        else:
+            self.calls.move_to_end(call_id)
+        return state
+
+    def observe(self, event: str, message: str) -> None:
+        """Track a published transcript delta or resync"""
+        if event == "transcript_delta":
+            delta = json.loads(message)
+            if not self._state(delta["call_id"]).apply(delta):
+                self.gaps += 1
+        elif event == "transcript_resync":
+            snapshot = json.loads(message)
+            state = self._state(snapshot["call_id"])
+            state.utterances = list(snapshot["utterances"])
+            state.seq = snapshot["seq"]
+
+    def forget(self, call_id: str) -> None:
+        self.calls.pop(call_id, None)
+
+    def snapshot(self, call_id: str) -> dict:
+        state = self.calls.get(call_id)
+        if state is None:
+            return TranscriptState(call_id).snapshot()
+        return state.snapshot()
+
+    def stats(self) -> dict:
+        return {"calls": len(self.calls), "gaps": self.gaps}
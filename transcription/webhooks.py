@@ -0,0 +1,122 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+WEBHOOK_QUEUE_SIZE = int(os.environ.get("WEBHOOK_QUEUE_SIZE", 1000))
+WEBHOOK_BATCH_SIZE = int(os.environ.get("WEBHOOK_BATCH_SIZE", 50))
+# Retell retries a webhook it thinks failed; the same (call_id, event) inside
+# this window is a redelivery and is dropped
+WEBHOOK_DEDUP_WINDOW = float(os.environ.get("WEBHOOK_DEDUP_WINDOW", 300.0))
+
+
+class WebhookQueue:
+    """Bounded queue between /webhook and the code that publishes its events.
+
+    The endpoint only enqueues, so Retell gets its 204 straight away. A single
+    consumer drains events in batches and drops duplicate (call_id, event)
+    deliveries seen within WEBHOOK_DEDUP_WINDOW seconds.
+    """
+
+    def __init__(
+        self,
+        process: Callable[[dict], Awaitable[None]],
+        maxsize: int = WEBHOOK_QUEUE_SIZE,
+        batch_size: int = WEBHOOK_BATCH_SIZE,
+        dedup_window: float = WEBHOOK_DEDUP_WINDOW,
+    ):
+        self.process = process
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.dedup_window = dedup_window
+        self.accepted = 0
+        self.rejected = 0
+        self.processed = 0
+        self.duplicates = 0
+        self.failed = 0
+        self.batches = 0
+        self.max_depth = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._total_lag = 0.0
+        # (call_id, event) -> when first processed, oldest first
+        self._seen: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue(self.maxsize)
+        self._task = asyncio.create_task(self._consume())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def enqueue(self, payload: dict) -> bool:
+        """False when the queue is full; the caller should ask Retell to retry"""
+        try:
+            self._queue.put_nowait((time.monotonic(), payload))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+        self.accepted += 1
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+        return True
+
+    def _take_batch(self, first) -> List[Tuple[float, dict]]:
+        batch = [first]
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    def _is_duplicate(self, payload: dict, now: float) -> bool:
+        while self._seen and next(iter(self._seen.values())) < now - self.dedup_window:
+            self._seen.popitem(last=False)
+        key = ((payload.get("call") or {}).get("call_id", "unknown"), payload.get("event"))
+        if key in self._seen:
+            return True
+        self._seen[key] = now
+        return False
+
+    async def _consume(self) -> None:
+        while True:
+            batch = self._take_batch(await self._queue.get())
+            self.batches += 1
+            now = time.monotonic()
+            for enqueued_at, payload in batch:
+                # Nothing a single payload does may stop the consumer
+                try:
+                    lag = now - enqueued_at
+                    self.last_lag = lag
+                    self.max_lag = max(self.max_lag, lag)
+                    self._total_lag += lag
+                    if self._is_duplicate(payload, now):
+                        self.duplicates += 1
+                        continue
+                    await self.process(payload)
+                    self.processed += 1
+                except Exception as e:
+                    self.failed += 1
+                    print(f"Error processing webhook {payload!r:.200}: {e!r}")
+
+    def stats(self) -> dict:
+        handled = self.processed + self.duplicates + self.failed
+        return {
+            "depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_depth": self.max_depth,
+            "capacity": self.maxsize,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "processed": self.processed,
+            "duplicates": self.duplicates,
+            "failed": self.failed,
+            "batches": self.batches,
+            "lag_ms": {
+                "last": round(self.last_lag * 1000, 1),
+                "max": round(self.max_lag * 1000, 1),
+                "avg": round(self._total_lag / handled * 1000, 1) if handled else 0.0,
+            },
+        }